@@ -0,0 +1,222 @@
+# -----------------------------------------------------------------------------
+# Copyright(c) 2017-2020 United Technologies Research Center Ireland Limited.
+# This document/file and its contents are property of United Technologies Research
+# Center Ireland Limited. You may not possess, use, copy or disclose this
+# document/file or any information in it, for any purpose without United Technologies
+# Research Center Ireland Limited’s express written permission. Neither receipt
+# nor possession of this document/file alone, from any source, constitutes such
+# permission. Possession, use, copying or disclosure by anyone without UTRC-I
+# express written permission is not authorized and may result in criminal and/or
+# civil liability.
+#
+# All rights reserved.
+#
+# Classification: EU ECCN: NSR, US ECCN: EAR99
+# -----------------------------------------------------------------------------
+#
+# Author: Riccardo Orizio
+# Date: Thu 02 Jan 2020
+# Description: Native nonogram solver based on line propagation and backtracking
+#
+
+
+import threading
+import time
+
+from typing import List, Optional
+
+from nonogram_lines import EMPTY, UNKNOWN, line_info
+from nonogrammeroo import Cell, NonogramBoard
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CONSTANTS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+ENGINE_NAME = "backtrack"
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CLASSES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class BacktrackSolver:
+    """ Solver alternating line propagation and branching on the most constrained cell
+
+    The statuses reported mimic the CP-SAT ones, so that both engines can be used interchangeably.
+
+    :ivar _size: (int) Mono-dimensional size of the board
+    :ivar _rows: (List[ LineInfo ]) Line information of the rows
+    :ivar _columns: (List[ LineInfo ]) Line information of the columns
+    :ivar _known: (List[ Tuple[ int, int, int ] ]) Cells whose colour is given by the board
+    :ivar _stop: (threading.Event) Event used to interrupt the search from another thread
+    :ivar _deadline: (float) Time at which the search is interrupted, None if there is no limit
+    :ivar _grids: (List[ List[ List[ int ] ] ]) Solutions found
+    :ivar _interrupted: (bool) True if the search did not explore the whole search space
+    :ivar _capped: (bool) True if the search has been stopped because it reached the maximum number of solutions
+    """
+
+    def __init__( self, board: NonogramBoard, stop: threading.Event = None ):
+        description = board.to_dict()
+        self._size = board.size
+        self._known = board.known_cells()
+        self._rows = [ line_info( self._size, constraint ) for constraint in description[ "rows" ] ]
+        self._columns = [ line_info( self._size, constraint ) for constraint in description[ "columns" ] ]
+        self._stop = stop if stop is not None else threading.Event()
+        self._deadline = None
+        self._grids = []
+        self._interrupted = False
+        self._capped = False
+
+    @property
+    def stop( self ) -> threading.Event:
+        return self._stop
+
+    @property
+    def grids( self ) -> List[ List[ List[ Cell ] ] ]:
+        return [ [ [ Cell( colour=value ) for value in row ] for row in grid ] for grid in self._grids ]
+
+    @property
+    def capped( self ) -> bool:
+        return self._capped
+
+    @property
+    def status( self ) -> str:
+        if self._interrupted:
+            return "FEASIBLE" if self._grids else "UNKNOWN"
+        return "OPTIMAL" if self._grids else "INFEASIBLE"
+
+    def solve( self, time_limit: float = None, max_solutions: int = None ) -> str:
+        """ Searching for all the solutions of the board
+
+        :param time_limit: Maximum number of seconds given to the search, no limit if None
+        :type time_limit: float
+        :param max_solutions: Number of solutions after which the search is stopped, no limit if None
+        :type max_solutions: int
+        :return: The status of the search
+        :rtype: str
+        """
+
+        self._deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self._grids = []
+        self._interrupted = False
+        self._capped = False
+
+        grid = [ [ UNKNOWN ] * self._size for _ in range( self._size ) ]
+        for row, col, colour in self._known:
+            grid[ row ][ col ] = colour
+        # Explicit stack of boards still to be explored, avoiding deep recursions on big boards
+        stack = [ ( grid, None ) ]
+        while stack:
+            if self._stop.is_set() or ( self._deadline is not None and time.perf_counter() > self._deadline ):
+                self._interrupted = True
+                break
+
+            grid, changed = stack.pop()
+            if not self._propagate( grid, changed ):
+                continue
+
+            cell = self._most_constrained( grid )
+            if cell is None:
+                self._grids.append( grid )
+                if max_solutions is not None and len( self._grids ) >= max_solutions:
+                    self._interrupted = bool( stack )
+                    self._capped = self._interrupted
+                    break
+                continue
+
+            # Trying the colours first and the empty value last, pushing them in reverse order
+            row, col = cell
+            colours = [ colour for colour in self._rows[ row ].colours if colour in self._columns[ col ].colours ]
+            for value in [ EMPTY ] + colours[ ::-1 ]:
+                branch = [ list( line ) for line in grid ]
+                branch[ row ][ col ] = value
+                stack.append( ( branch, ( row, col ) ) )
+
+        return self.status
+
+    def _propagate( self, grid: List[ List[ int ] ], changed: Optional[ tuple ] ) -> bool:
+        """ Settling rows and columns until a fix point is reached
+
+        :param grid: Board to propagate, modified in place
+        :type grid: List[ List[ int ] ]
+        :param changed: Cell modified by the last branch, all the lines are checked if None
+        :type changed: Optional[ tuple ]
+        :return: False if a line cannot be satisfied anymore, True otherwise
+        :rtype: bool
+        """
+
+        if changed is None:
+            dirty_rows = set( range( self._size ) )
+            dirty_columns = set( range( self._size ) )
+        else:
+            dirty_rows = { changed[ 0 ] }
+            dirty_columns = { changed[ 1 ] }
+
+        while dirty_rows or dirty_columns:
+            if dirty_rows:
+                row = dirty_rows.pop()
+                settled = self._rows[ row ].settle( grid[ row ] )
+                if settled is None:
+                    return False
+                for col in range( self._size ):
+                    if settled[ col ] != grid[ row ][ col ]:
+                        grid[ row ][ col ] = settled[ col ]
+                        dirty_columns.add( col )
+            else:
+                col = dirty_columns.pop()
+                settled = self._columns[ col ].settle( [ line[ col ] for line in grid ] )
+                if settled is None:
+                    return False
+                for row in range( self._size ):
+                    if settled[ row ] != grid[ row ][ col ]:
+                        grid[ row ][ col ] = settled[ row ]
+                        dirty_rows.add( row )
+
+        return True
+
+    def _most_constrained( self, grid: List[ List[ int ] ] ) -> Optional[ tuple ]:
+        """ Selecting the unknown cell whose row and column have the fewest unknown cells left
+
+        :param grid: Board to inspect
+        :type grid: List[ List[ int ] ]
+        :return: Coordinates of the selected cell, None if the board is complete
+        :rtype: Optional[ tuple ]
+        """
+
+        row_unknown = [ line.count( UNKNOWN ) for line in grid ]
+        column_unknown = [ sum( 1 for line in grid if line[ col ] == UNKNOWN ) for col in range( self._size ) ]
+
+        best = None
+        best_score = None
+        for row in range( self._size ):
+            if not row_unknown[ row ]:
+                continue
+            for col in range( self._size ):
+                if grid[ row ][ col ] == UNKNOWN:
+                    score = row_unknown[ row ] + column_unknown[ col ]
+                    if best_score is None or score < best_score:
+                        best, best_score = ( row, col ), score
+
+        return best
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FUNCTIONS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def solve_backtrack( board: NonogramBoard,
+                     time_limit: float = None,
+                     stop: threading.Event = None,
+                     max_solutions: int = None ) -> None:
+    """ Solving the board with the native engine, storing the results as :meth:`NonogramBoard.solve` does
+
+    :param board: Board to solve
+    :type board: NonogramBoard
+    :param time_limit: Maximum number of seconds given to the search, no limit if None
+    :type time_limit: float
+    :param stop: Event used to interrupt the search from another thread
+    :type stop: threading.Event
+    :param max_solutions: Number of solutions after which the search is stopped, no limit if None
+    :type max_solutions: int
+    :return: None
+    :rtype: None
+    """
+
+    solver = BacktrackSolver( board, stop )
+    board.status = solver.solve( time_limit, max_solutions )
+    board.solutions = []
+    board.grids = solver.grids
+    board.engine = ENGINE_NAME
+    board.capped = solver.capped
@@ -0,0 +1,248 @@
+# -----------------------------------------------------------------------------
+# Copyright(c) 2017-2020 United Technologies Research Center Ireland Limited.
+# This document/file and its contents are property of United Technologies Research
+# Center Ireland Limited. You may not possess, use, copy or disclose this
+# document/file or any information in it, for any purpose without United Technologies
+# Research Center Ireland Limited’s express written permission. Neither receipt
+# nor possession of this document/file alone, from any source, constitutes such
+# permission. Possession, use, copying or disclosure by anyone without UTRC-I
+# express written permission is not authorized and may result in criminal and/or
+# civil liability.
+#
+# All rights reserved.
+#
+# Classification: EU ECCN: NSR, US ECCN: EAR99
+# -----------------------------------------------------------------------------
+#
+# Author: Riccardo Orizio
+# Date: Thu 02 Jan 2020
+# Description: Cheap estimate of the work needed to solve a board, computed from its constraints only
+#
+# The lane thresholds are calibrated on the boards of nonogrammeroo.main, see "python nonogrammeroo.py --estimate",
+# the 25x25 board being defined there but left out of the boards solved by default:
+#
+#   size   fixed   search space   variables   constraints   CP-SAT
+#      5    0.80           10^3          85           121   0.01s
+#     10    0.34          10^19         257           284   0.02s
+#     15    0.16          10^43         522           493   0.06s
+#     25    0.01         10^184        1525          1160   no solution within 10s (board #510, TAAI 2011)
+#
+# Random 20x20 to 30x30 boards with less than 10% of the cells fixed also hit a 10s limit, while a 25x25 board
+# with 25% of the cells fixed took 3s.
+#
+
+
+from math import comb, log10
+
+from typing import Dict, List, Tuple
+
+from nonogrammeroo import NonogramBoard
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CONSTANTS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+LANE_FAST = "fast"
+LANE_HEAVY = "heavy"
+
+# Boards are sent to the fast lane when a single propagation pass fixes at least this fraction of the cells...
+FAST_MIN_FIXED = 0.15
+# ...and the placements of all the lines, taken independently, are at most 10 to this power
+FAST_MAX_SEARCH_SPACE = 50.0
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CLASSES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class BoardEstimate:
+    """ Signals on the cost of solving a board, available before building any model
+
+    :ivar _size: (int) Mono-dimensional size of the board
+    :ivar _row_slack: (List[ int ]) Free cells of each row, i.e. size - sum( constraint ) - gaps, negative if the
+        constraint does not fit
+    :ivar _column_slack: (List[ int ]) Free cells of each column
+    :ivar _fixed: (int) Cells fixed by settling every row and every column once on the empty board
+    :ivar _search_space: (float) Base 10 logarithm of the product of the number of placements of every line
+    :ivar _variables: (int) Variables of the CP model built by :meth:`NonogramBoard.solve`
+    :ivar _constraints: (int) Constraints of the CP model built by :meth:`NonogramBoard.solve`
+    """
+
+    def __init__( self, size: int, row_slack: List[ int ], column_slack: List[ int ], fixed: int,
+                  search_space: float, variables: int, constraints: int ):
+        self._size = size
+        self._row_slack = row_slack
+        self._column_slack = column_slack
+        self._fixed = fixed
+        self._search_space = search_space
+        self._variables = variables
+        self._constraints = constraints
+
+    @property
+    def size( self ) -> int:
+        return self._size
+
+    @property
+    def row_slack( self ) -> List[ int ]:
+        return self._row_slack
+
+    @property
+    def column_slack( self ) -> List[ int ]:
+        return self._column_slack
+
+    @property
+    def fixed( self ) -> int:
+        return self._fixed
+
+    @property
+    def fixed_fraction( self ) -> float:
+        return self._fixed / ( self._size * self._size ) if self._size else 1.0
+
+    @property
+    def search_space( self ) -> float:
+        return self._search_space
+
+    @property
+    def variables( self ) -> int:
+        return self._variables
+
+    @property
+    def constraints( self ) -> int:
+        return self._constraints
+
+    @property
+    def feasible( self ) -> bool:
+        return min( self._row_slack + self._column_slack + [ 0 ] ) >= 0
+
+    @property
+    def lane( self ) -> str:
+        # Lines not fitting their constraint are rejected straight away by the solver
+        if not self.feasible:
+            return LANE_FAST
+        if self.fixed_fraction >= FAST_MIN_FIXED and self._search_space <= FAST_MAX_SEARCH_SPACE:
+            return LANE_FAST
+        return LANE_HEAVY
+
+    def to_dict( self ) -> Dict:
+        """ Describing the estimate as a dictionary of plain types, e.g. to be sent as JSON
+
+        :return: Dictionary of all the signals and of the suggested lane
+        :rtype: Dict
+        """
+
+        return { "size": self._size,
+                 "row_slack": self._row_slack,
+                 "column_slack": self._column_slack,
+                 "fixed": self._fixed,
+                 "fixed_fraction": self.fixed_fraction,
+                 "search_space": self._search_space,
+                 "variables": self._variables,
+                 "constraints": self._constraints,
+                 "lane": self.lane }
+
+    def __str__( self ):
+        return "{}x{}: {} lane, {:.0%} fixed, 10^{:.0f} placements, {} variables, {} constraints".format(
+                self._size, self._size, self.lane, self.fixed_fraction, self._search_space, self._variables,
+                self._constraints )
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FUNCTIONS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def _estimate_line( size: int, constraint: List ) -> Tuple[ int, int, int, int, int ]:
+    """ Settling a line of the empty board by overlapping the leftmost and rightmost placements of its blocks
+
+    Cells covered by a block in both placements are full, cells out of reach of every block are empty; on an empty
+    line this is exactly what :meth:`nonogram_lines.LineInfo.settle` finds, without enumerating the placements.
+
+    :param size: Length of the line
+    :type size: int
+    :param constraint: Constraint of the line, either block lengths or ( length, colour ) pairs
+    :type constraint: List
+    :return: Slack of the line, mask of its fixed cells, number of its non empty blocks, number of its full cells
+        and highest colour
+    :rtype: Tuple[ int, int, int, int, int ]
+    """
+
+    # Leftmost placement, blocks of the same colour being separated by one empty cell
+    blocks = []
+    start = 0
+    cells = 0
+    previous = None
+    highest = 1
+    for el in constraint:
+        if isinstance( el, int ):
+            length, colour = el, 1
+        else:
+            length, colour = el
+            highest = max( highest, colour )
+        if length == 0:
+            continue
+        if colour == previous:
+            start += 1
+        blocks.append( ( start, length ) )
+        start += length
+        cells += length
+        previous = colour
+
+    slack = size - start
+    if slack < 0:
+        return slack, 0, len( blocks ), cells, highest
+
+    full = 0
+    reachable = 0
+    for start, length in blocks:
+        if length > slack:
+            full |= ( ( 1 << ( length - slack ) ) - 1 ) << ( start + slack )
+        reachable |= ( ( 1 << ( length + slack ) ) - 1 ) << start
+
+    return slack, full | ( ( ( 1 << size ) - 1 ) & ~reachable ), len( blocks ), cells, highest
+
+
+def estimate( board: NonogramBoard ) -> BoardEstimate:
+    """ Estimating the work needed to solve a board from its constraints, without building its model
+
+    :param board: Board to estimate
+    :type board: NonogramBoard
+    :return: The estimate of the board
+    :rtype: BoardEstimate
+    """
+
+    size = board.size
+    search_space = 0.0
+    # Model of solve(), black and white boards: one variable per cell and, for each line, one variable per space and
+    # per full cell of the constraint, linked to the cells by two constraints, plus the two sums of the line;
+    # multi-colour boards: one variable per cell and an automaton per line. Both sizes are counted, since the colours
+    # of the board are only known at the end; forced cells are fixed by both models
+    variables = size * size
+    constraints = 0
+    colour_constraints = 0
+    colours = 1
+
+    slacks = { "row": [], "column": [] }
+    fixed = 0
+    zeros = "0" * ( size - 1 )
+    for direction, lines in [ ( "row", board.rows ), ( "column", board.columns ) ]:
+        for index, region in enumerate( lines ):
+            constraint = region.constraint
+            slack, fixed_mask, blocks, full_cells, highest = _estimate_line( size, constraint )
+            slacks[ direction ].append( slack )
+            colours = max( colours, highest )
+            if slack >= 0:
+                search_space += log10( comb( slack + blocks, blocks ) )
+
+            forced = bin( fixed_mask ).count( "1" )
+            variables += len( constraint ) + 1 + full_cells
+            constraints += 2 + 2 * full_cells + forced
+            colour_constraints += 1 + forced
+
+            if direction == "row":
+                fixed |= fixed_mask << ( index * size )
+            else:
+                # Moving bit i of the column to bit i * size of the board, interleaving its digits with zeros
+                fixed |= int( zeros.join( format( fixed_mask, "0{}b".format( size ) ) ), 2 ) << index
+
+    if colours > 1:
+        variables = size * size
+        constraints = colour_constraints
+
+    return BoardEstimate( size,
+                          slacks[ "row" ],
+                          slacks[ "column" ],
+                          bin( fixed ).count( "1" ),
+                          search_space,
+                          variables,
+                          constraints )
@@ -0,0 +1,285 @@
+# -----------------------------------------------------------------------------
+# Copyright(c) 2017-2020 United Technologies Research Center Ireland Limited.
+# This document/file and its contents are property of United Technologies Research
+# Center Ireland Limited. You may not possess, use, copy or disclose this
+# document/file or any information in it, for any purpose without United Technologies
+# Research Center Ireland Limited’s express written permission. Neither receipt
+# nor possession of this document/file alone, from any source, constitutes such
+# permission. Possession, use, copying or disclosure by anyone without UTRC-I
+# express written permission is not authorized and may result in criminal and/or
+# civil liability.
+#
+# All rights reserved.
+#
+# Classification: EU ECCN: NSR, US ECCN: EAR99
+# -----------------------------------------------------------------------------
+#
+# Author: Riccardo Orizio
+# Date: Thu 02 Jan 2020
+# Description: Bulk conversion of bitmaps into nonogram puzzles
+#
+# Images are read from PBM and PGM files, either plain or raw, or from NumPy arrays, e.g. a stack of images saved as
+# a .npy file and memory-mapped. Pixels darker than a threshold become the full cells of the solution, from which
+# the constraints of all the rows and columns are extracted at once with vectorized run-length encoding.
+#
+
+
+import argparse
+import json
+import sys
+
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, TextIO, Tuple
+
+from nonogrammeroo import NonogramBoard
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CONSTANTS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+DEFAULT_THRESHOLD = 0.5
+
+NETPBM_BITMAPS = [ b"P1", b"P4" ]
+NETPBM_GRAYMAPS = [ b"P2", b"P5" ]
+NETPBM_PLAIN = [ b"P1", b"P2" ]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FUNCTIONS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def _read_header( data: bytes, fields: int ) -> Tuple[ List[ bytes ], int ]:
+    """ Reading the whitespace separated fields of a Netpbm header, skipping the comments
+
+    :param data: Beginning of the file, long enough to contain the whole header
+    :type data: bytes
+    :param fields: Number of fields to read, magic number included
+    :type fields: int
+    :return: The fields read and the offset of the first byte following the header
+    :rtype: Tuple[ List[ bytes ], int ]
+
+    :raises ValueError: error raised when the header is truncated
+    """
+
+    tokens = []
+    position = 0
+    while len( tokens ) < fields:
+        if position >= len( data ):
+            raise ValueError( "Truncated Netpbm header" )
+        if data[ position:position + 1 ] == b"#":
+            position = data.find( b"\n", position )
+            position = len( data ) if position < 0 else position
+        elif data[ position:position + 1 ].isspace():
+            position += 1
+        else:
+            end = position
+            while end < len( data ) and not data[ end:end + 1 ].isspace() and data[ end:end + 1 ] != b"#":
+                end += 1
+            tokens.append( data[ position:end ] )
+            position = end
+
+    # A single whitespace separates the header from the raw pixels
+    return tokens, position + 1
+
+
+def read_netpbm( path: str, threshold: float = DEFAULT_THRESHOLD, memory_map: bool = True ) -> np.ndarray:
+    """ Reading a PBM or PGM file as the cells of a solution
+
+    :param path: Path of the file
+    :type path: str
+    :param threshold: Fraction of the maximum gray value below which a pixel of a PGM file is considered full
+    :type threshold: float
+    :param memory_map: Memory-mapping the pixels of raw files instead of reading them
+    :type memory_map: bool
+    :return: Boolean array of the full cells, one row per line of the image
+    :rtype: np.ndarray
+
+    :raises ValueError: error raised when the file is not a PBM or PGM file
+    """
+
+    with open( path, "rb" ) as image_file:
+        head = image_file.read( 1024 )
+        magic = head[ :2 ]
+        if magic not in NETPBM_BITMAPS + NETPBM_GRAYMAPS:
+            raise ValueError( "{} is not a PBM or PGM file".format( path ) )
+
+        fields, offset = _read_header( head, 3 if magic in NETPBM_BITMAPS else 4 )
+        width, height = int( fields[ 1 ] ), int( fields[ 2 ] )
+        maxval = int( fields[ 3 ] ) if magic in NETPBM_GRAYMAPS else 1
+
+        if magic in NETPBM_PLAIN:
+            image_file.seek( offset - 1 )
+            body = image_file.read()
+            if magic == b"P1":
+                # Bits of plain bitmaps do not need to be separated
+                pixels = np.frombuffer( body, dtype=np.uint8 )
+                pixels = pixels[ ( pixels == ord( "0" ) ) | ( pixels == ord( "1" ) ) ] - ord( "0" )
+            else:
+                pixels = np.array( body.split(), dtype=np.int64 )
+            pixels = pixels[ :width * height ].reshape( height, width )
+        elif magic == b"P4":
+            row_bytes = ( width + 7 ) // 8
+            if memory_map:
+                packed = np.memmap( path, dtype=np.uint8, mode="r", offset=offset, shape=( height, row_bytes ) )
+            else:
+                image_file.seek( offset )
+                packed = np.frombuffer( image_file.read( height * row_bytes ), dtype=np.uint8 ).reshape( height,
+                                                                                                         row_bytes )
+            pixels = np.unpackbits( packed, axis=1 )[ :, :width ]
+        else:
+            dtype = np.dtype( np.uint8 ) if maxval < 256 else np.dtype( ">u2" )
+            if memory_map:
+                pixels = np.memmap( path, dtype=dtype, mode="r", offset=offset, shape=( height, width ) )
+            else:
+                image_file.seek( offset )
+                pixels = np.frombuffer( image_file.read( height * width * dtype.itemsize ), dtype=dtype ).reshape(
+                        height, width )
+
+    # Bitmaps use 1 for black, graymaps use 0 for black
+    if magic in NETPBM_BITMAPS:
+        return pixels.astype( bool )
+
+    return pixels < threshold * maxval
+
+
+def line_constraints( filled: np.ndarray ) -> List[ List[ int ] ]:
+    """ Extracting the constraints of all the rows of an image at once
+
+    The rows are padded with an empty cell on both sides, so that every block starts with a +1 step and ends with a
+    -1 step of the padded values; since both are found in row-major order, the i-th start and the i-th end belong to
+    the same block.
+
+    :param filled: Boolean array of the full cells
+    :type filled: np.ndarray
+    :return: The lengths of the blocks of each row
+    :rtype: List[ List[ int ] ]
+    """
+
+    height, width = filled.shape
+    padded = np.zeros( ( height, width + 2 ), dtype=np.int8 )
+    padded[ :, 1:-1 ] = filled
+    steps = np.diff( padded, axis=1 )
+
+    block_rows, starts = np.nonzero( steps == 1 )
+    _, ends = np.nonzero( steps == -1 )
+    lengths = ends - starts
+    splits = np.cumsum( np.bincount( block_rows, minlength=height ) )[ :-1 ]
+
+    return [ blocks.tolist() for blocks in np.split( lengths, splits ) ]
+
+
+def puzzle_of( filled: np.ndarray ) -> Dict:
+    """ Describing the puzzle of an image as :meth:`NonogramBoard.to_dict` does
+
+    Boards are square, so rectangular images are padded with empty cells on the right or on the bottom.
+
+    :param filled: Boolean array of the full cells
+    :type filled: np.ndarray
+    :return: Dictionary with keys "size", "rows" and "columns"
+    :rtype: Dict
+    """
+
+    height, width = filled.shape
+    size = max( height, width )
+    if height != width:
+        square = np.zeros( ( size, size ), dtype=bool )
+        square[ :height, :width ] = filled
+        filled = square
+
+    return { "size": size, "rows": line_constraints( filled ), "columns": line_constraints( filled.T ) }
+
+
+def board_of( filled: np.ndarray ) -> NonogramBoard:
+    """ Creating the board of an image
+
+    :param filled: Boolean array of the full cells
+    :type filled: np.ndarray
+    :return: The board with all the constraints applied
+    :rtype: NonogramBoard
+    """
+
+    return NonogramBoard.from_dict( puzzle_of( filled ) )
+
+
+def images_of( sources: Iterable[ str ], threshold: float = DEFAULT_THRESHOLD ) -> Iterator[ np.ndarray ]:
+    """ Streaming the images of a list of files
+
+    Netpbm files hold a single image, .npy files hold either a single image or a stack of images along their first
+    axis, memory-mapped and read one image at a time; non boolean arrays are thresholded as normalised gray values.
+
+    :param sources: Paths of the files
+    :type sources: Iterable[ str ]
+    :param threshold: Fraction of the maximum gray value below which a pixel is considered full
+    :type threshold: float
+    :return: Generator of the boolean arrays of the full cells
+    :rtype: Iterator[ np.ndarray ]
+    """
+
+    for source in sources:
+        if not source.endswith( ".npy" ):
+            yield read_netpbm( source, threshold )
+            continue
+
+        images = np.load( source, mmap_mode="r" )
+        for image in images if images.ndim == 3 else [ images ]:
+            yield image if image.dtype == bool else image < threshold * ( np.iinfo( image.dtype ).max
+                                                                          if image.dtype.kind in "ui" else 1.0 )
+
+
+def import_boards( sources: Iterable[ str ], threshold: float = DEFAULT_THRESHOLD ) -> Iterator[ NonogramBoard ]:
+    """ Streaming the boards of a list of image files
+
+    :param sources: Paths of the files, see :func:`images_of`
+    :type sources: Iterable[ str ]
+    :param threshold: Fraction of the maximum gray value below which a pixel is considered full
+    :type threshold: float
+    :return: Generator of the boards
+    :rtype: Iterator[ NonogramBoard ]
+    """
+
+    for filled in images_of( sources, threshold ):
+        yield board_of( filled )
+
+
+def write_puzzles( sources: Iterable[ str ], output: TextIO, threshold: float = DEFAULT_THRESHOLD ) -> int:
+    """ Writing the puzzles of a list of image files as JSON lines, the format read by the solver service
+
+    :param sources: Paths of the files, see :func:`images_of`
+    :type sources: Iterable[ str ]
+    :param output: Stream on which the puzzles are written
+    :type output: TextIO
+    :param threshold: Fraction of the maximum gray value below which a pixel is considered full
+    :type threshold: float
+    :return: Number of puzzles written
+    :rtype: int
+    """
+
+    count = 0
+    for filled in images_of( sources, threshold ):
+        output.write( json.dumps( puzzle_of( filled ), separators=( ",", ":" ) ) )
+        output.write( "\n" )
+        count += 1
+
+    return count
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ MAIN ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+
+def main():
+    # region Command Line arguments
+    # Reading arguments from command line
+    arg_parser = argparse.ArgumentParser( description="Converting PBM, PGM and .npy images into nonogram puzzles" )
+    arg_parser.add_argument( "images", nargs="+", help="Image files, .npy files might hold a stack of images" )
+    arg_parser.add_argument( "--output", dest="output", default=None,
+                             help="File on which the puzzles are written as JSON lines, stdout if not given" )
+    arg_parser.add_argument( "--threshold", dest="threshold", default=DEFAULT_THRESHOLD, type=float,
+                             help="Fraction of the maximum gray value below which a pixel is considered full" )
+
+    input_args = vars( arg_parser.parse_args() )
+    # endregion
+
+    if input_args[ "output" ] is None:
+        write_puzzles( input_args[ "images" ], sys.stdout, input_args[ "threshold" ] )
+    else:
+        with open( input_args[ "output" ], "w" ) as output:
+            write_puzzles( input_args[ "images" ], output, input_args[ "threshold" ] )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,638 @@
+# -----------------------------------------------------------------------------
+# Copyright(c) 2017-2020 United Technologies Research Center Ireland Limited.
+# This document/file and its contents are property of United Technologies Research
+# Center Ireland Limited. You may not possess, use, copy or disclose this
+# document/file or any information in it, for any purpose without United Technologies
+# Research Center Ireland Limited’s express written permission. Neither receipt
+# nor possession of this document/file alone, from any source, constitutes such
+# permission. Possession, use, copying or disclosure by anyone without UTRC-I
+# express written permission is not authorized and may result in criminal and/or
+# civil liability.
+#
+# All rights reserved.
+#
+# Classification: EU ECCN: NSR, US ECCN: EAR99
+# -----------------------------------------------------------------------------
+#
+# Author: Riccardo Orizio
+# Date: Thu 02 Jan 2020
+# Description: Memoized information on the placements of a constraint on a line
+#
+# Most lines of a corpus share a handful of ( length, constraint ) pairs, so everything that only depends on them is
+# computed once and kept in a table shared by all the engines. The table can be saved on a file and memory-mapped by
+# other processes, e.g. the workers of the solver service, which then read the entries from the shared page cache.
+#
+
+
+import argparse
+import json
+import mmap
+import pickle
+import struct
+import threading
+
+from collections import OrderedDict
+from math import comb
+from typing import List, Optional, Tuple
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CONSTANTS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+UNKNOWN = -1
+EMPTY = 0
+FULL = 1
+
+# Lines with more placements than this are settled by dynamic programming instead of enumerating the placements
+PLACEMENT_LIMIT = 4096
+# Default size of a table, measured in stored placements plus one per entry
+DEFAULT_CAPACITY = 1 << 20
+
+FILE_MAGIC = b"NGLT\x01"
+FILE_HEADER = struct.Struct( "<5sQ" )
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CLASSES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class LineInfo:
+    """ Information on the placements of a constraint on a line of a given length
+
+    A constraint is a sequence of blocks, either plain lengths for black blocks or ( length, colour ) pairs, where
+    colours are numbered from 1. Blocks of the same colour are separated by at least one empty cell, blocks of
+    different colours might touch.
+
+    The masks hold one plane of bits per colour of the constraint, cell i of the plane of the k-th colour being
+    represented by bit k * length + i; black and white lines therefore have a single plane.
+
+    :ivar _length: (int) Length of the line
+    :ivar _constraint: (Tuple) Canonical constraint, see :func:`canonical_constraint`
+    :ivar _colours: (Tuple[ int ]) Colours of the constraint, in the order of their planes
+    :ivar _count: (int) Number of valid placements
+    :ivar _placements: (List[ int ]) Masks of the filled cells of every valid placement, generated on first use, None
+        if there are too many or they have not been generated yet
+    :ivar _leftmost: (Tuple[ int ]) Start of each block when all the blocks are pushed to the left
+    :ivar _rightmost: (Tuple[ int ]) Start of each block when all the blocks are pushed to the right
+    :ivar _forced: (Tuple[ int ]) Value of each cell in every placement, UNKNOWN if placements disagree
+    :ivar _automaton: (Tuple) Automaton accepting the valid lines, computed on first use
+    """
+
+    def __init__( self, length: int, constraint: Tuple ):
+        self._length = length
+        self._constraint = canonical_constraint( constraint )
+        self._colours = tuple( sorted( { colour for _, colour in self.blocks } ) )
+        self._automaton = None
+
+        blocks = self.blocks
+        gaps = self.gaps
+        slack = length - sum( block for block, _ in blocks ) - sum( gaps )
+        self._count = comb( slack + len( blocks ), len( blocks ) ) if slack >= 0 else 0
+
+        self._leftmost = ()
+        self._rightmost = ()
+        if self._count:
+            start = 0
+            leftmost = []
+            for ( block, _ ), gap in zip( blocks, gaps + [ 0 ] ):
+                leftmost.append( start )
+                start += block + gap
+            self._leftmost = tuple( leftmost )
+            self._rightmost = tuple( left + slack for left in leftmost )
+
+        # Placements are only needed to settle partly known lines, which many lines of a board never are
+        self._placements = None
+        if not self._count:
+            # Constraints longer than the line have no placement at all
+            self._placements = []
+
+        self._forced = ()
+        if self._count:
+            # Cells covered by a block in both its leftmost and rightmost placements take its colour, cells out of
+            # reach of every block are empty
+            forced = [ EMPTY ] * length
+            for ( block, _ ), left, right in zip( blocks, self._leftmost, self._rightmost ):
+                forced[ left:right + block ] = [ UNKNOWN ] * ( right + block - left )
+            for ( block, colour ), left, right in zip( blocks, self._leftmost, self._rightmost ):
+                forced[ right:left + block ] = [ colour ] * max( 0, left + block - right )
+            self._forced = tuple( forced )
+
+    @property
+    def length( self ) -> int:
+        return self._length
+
+    @property
+    def constraint( self ) -> Tuple:
+        return self._constraint
+
+    @property
+    def blocks( self ) -> List[ Tuple[ int, int ] ]:
+        return [ ( block, 1 ) if isinstance( block, int ) else block for block in self._constraint ]
+
+    @property
+    def gaps( self ) -> List[ int ]:
+        blocks = self.blocks
+        return [ 1 if blocks[ j ][ 1 ] == blocks[ j + 1 ][ 1 ] else 0 for j in range( len( blocks ) - 1 ) ]
+
+    @property
+    def colours( self ) -> Tuple[ int, ... ]:
+        return self._colours
+
+    @property
+    def count( self ) -> int:
+        return self._count
+
+    @property
+    def placements( self ) -> Optional[ List[ int ] ]:
+        if self._placements is None and self._count <= PLACEMENT_LIMIT:
+            self._placements = list( self._generate( 0, 0 ) )
+        return self._placements
+
+    @property
+    def leftmost( self ) -> Tuple[ int, ... ]:
+        return self._leftmost
+
+    @property
+    def rightmost( self ) -> Tuple[ int, ... ]:
+        return self._rightmost
+
+    @property
+    def forced( self ) -> Tuple[ int, ... ]:
+        return self._forced
+
+    @property
+    def forced_full( self ) -> int:
+        return sum( 1 << i for i, value in enumerate( self._forced ) if value not in [ UNKNOWN, EMPTY ] )
+
+    @property
+    def forced_empty( self ) -> int:
+        return sum( 1 << i for i, value in enumerate( self._forced ) if value == EMPTY )
+
+    @property
+    def automaton( self ) -> Tuple[ int, List[ int ], List[ Tuple[ int, int, int ] ] ]:
+        if self._automaton is None:
+            self._automaton = self._compile()
+        return self._automaton
+
+    @property
+    def weight( self ) -> int:
+        # Accounting for the placements before they are generated, so that the weight of an entry never changes
+        return 1 + ( self._count if self._count <= PLACEMENT_LIMIT else 0 )
+
+    def __reduce__( self ):
+        # Pickling the plain values only, so that files saved by the command line can be read by any process
+        return _restore_info, ( self._length,
+                                self._constraint,
+                                self._colours,
+                                self._count,
+                                self.placements,
+                                self._leftmost,
+                                self._rightmost,
+                                self._forced,
+                                self._automaton )
+
+    def _generate( self, block: int, start: int ):
+        """ Generating the masks of the placements of the blocks from the given one onwards
+
+        :param block: Index of the first block to place
+        :type block: int
+        :param start: First cell available to the block
+        :type start: int
+        :return: Generator of the masks of the placements
+        """
+
+        blocks = self.blocks
+        if block == len( blocks ):
+            yield 0
+            return
+
+        length, colour = blocks[ block ]
+        plane = self._colours.index( colour ) * self._length
+        gap = self.gaps[ block ] if block < len( blocks ) - 1 else 0
+        for position in range( start, self._rightmost[ block ] + 1 ):
+            mask = span( position, position + length ) << plane
+            for tail in self._generate( block + 1, position + length + gap ):
+                yield mask | tail
+
+    def _compile( self ) -> Tuple[ int, List[ int ], List[ Tuple[ int, int, int ] ] ]:
+        """ Compiling the deterministic automaton reading the values of the cells and accepting the valid lines
+
+        The states are the gaps after each number of blocks placed, and each cell of each block.
+
+        :return: Starting state, final states and ( state, value, next state ) transitions, as for AddAutomaton
+        :rtype: Tuple[ int, List[ int ], List[ Tuple[ int, int, int ] ] ]
+        """
+
+        blocks = self.blocks
+        gap_state = list( range( len( blocks ) + 1 ) )
+        block_state = []
+        state = len( gap_state )
+        for length, _ in blocks:
+            block_state.append( list( range( state, state + length ) ) )
+            state += length
+
+        transitions = []
+        for j, gap in enumerate( gap_state ):
+            transitions.append( ( gap, EMPTY, gap ) )
+            if j < len( blocks ):
+                transitions.append( ( gap, blocks[ j ][ 1 ], block_state[ j ][ 0 ] ) )
+
+        for j, ( length, colour ) in enumerate( blocks ):
+            for i in range( length - 1 ):
+                transitions.append( ( block_state[ j ][ i ], colour, block_state[ j ][ i + 1 ] ) )
+            # A block is closed by an empty cell, or directly by the following block if of a different colour
+            transitions.append( ( block_state[ j ][ -1 ], EMPTY, gap_state[ j + 1 ] ) )
+            if j + 1 < len( blocks ) and blocks[ j + 1 ][ 1 ] != colour:
+                transitions.append( ( block_state[ j ][ -1 ], blocks[ j + 1 ][ 1 ], block_state[ j + 1 ][ 0 ] ) )
+
+        finals = [ gap_state[ -1 ] ] + ( [ block_state[ -1 ][ -1 ] ] if blocks else [] )
+
+        return gap_state[ 0 ], finals, transitions
+
+    def settle( self, line: List[ int ] ) -> Optional[ List[ int ] ]:
+        """ Deducing every cell of a line that has the same value in all the placements compatible with it
+
+        :param line: Current values of the line, either UNKNOWN, EMPTY or a colour, FULL for black and white lines
+        :type line: List[ int ]
+        :return: The settled line, None if no placement is compatible with the current values
+        :rtype: Optional[ List[ int ] ]
+        """
+
+        if not self._count:
+            return None
+
+        # Nothing new to deduce from an unknown line besides what is always forced
+        if all( value == UNKNOWN for value in line ):
+            return list( self._forced )
+
+        return self._settle( line )
+
+    def _settle( self, line: List[ int ] ) -> Optional[ List[ int ] ]:
+        """ Settling a line by filtering the placements, or by dynamic programming if they have not been stored
+
+        :param line: Current values of the line
+        :type line: List[ int ]
+        :return: The settled line, None if no placement is compatible with the current values
+        :rtype: Optional[ List[ int ] ]
+        """
+
+        placements = self.placements
+        if placements is None:
+            return settle_line( self.blocks, line )
+
+        length = self._length
+        planes = len( self._colours )
+        # Cell i in all the planes
+        column = sum( 1 << ( plane * length ) for plane in range( planes ) )
+
+        required = 0
+        forbidden = 0
+        for i, value in enumerate( line ):
+            if value == EMPTY:
+                forbidden |= column << i
+            elif value != UNKNOWN:
+                if value not in self._colours:
+                    return None
+                required |= 1 << ( self._colours.index( value ) * length + i )
+
+        cells = ( 1 << length ) - 1
+        always = -1
+        sometimes = 0
+        covered = -1
+        for placement in placements:
+            if placement & forbidden or placement & required != required:
+                continue
+            always &= placement
+            sometimes |= placement
+            if planes > 1:
+                union = 0
+                for plane in range( planes ):
+                    union |= placement >> ( plane * length ) & cells
+                covered &= union
+
+        if always == -1:
+            return None
+        if planes <= 1:
+            covered = always
+
+        result = [ UNKNOWN ] * length
+        for i in range( length ):
+            if not covered >> i & 1:
+                if not any( sometimes >> ( plane * length + i ) & 1 for plane in range( planes ) ):
+                    result[ i ] = EMPTY
+                continue
+            for plane in range( planes ):
+                if always >> ( plane * length + i ) & 1:
+                    result[ i ] = self._colours[ plane ]
+                    break
+
+        return result
+
+
+class LineTable:
+    """ Table of :class:`LineInfo` keyed by ( length, constraint ), evicting the least recently used entries
+
+    :ivar _capacity: (int) Maximum total weight of the entries kept in memory
+    :ivar _entries: (OrderedDict) Entries in memory, from the least to the most recently used
+    :ivar _weight: (int) Total weight of the entries in memory
+    :ivar _lock: (threading.Lock) Lock protecting the table from concurrent engines
+    :ivar _mmap: (mmap.mmap) Memory-mapped file the missing entries are looked up in, None if not attached
+    :ivar _index: (Dict[ Tuple, Tuple[ int, int ] ]) Offset and size of each entry of the memory-mapped file
+    """
+
+    def __init__( self, capacity: int = DEFAULT_CAPACITY, path: str = None ):
+        self._capacity = capacity
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._index = {}
+        if path is not None:
+            self.attach( path )
+
+    @property
+    def capacity( self ) -> int:
+        return self._capacity
+
+    @property
+    def weight( self ) -> int:
+        return self._weight
+
+    def __len__( self ):
+        return len( self._entries )
+
+    def get( self, length: int, constraint ) -> LineInfo:
+        """ Retrieving the information of a line, computing it if neither in memory nor in the attached file
+
+        :param length: Length of the line
+        :type length: int
+        :param constraint: Constraint of the line
+        :return: The information of the line
+        :rtype: LineInfo
+        """
+
+        key = ( length, canonical_constraint( constraint ) )
+        with self._lock:
+            info = self._entries.get( key )
+            if info is not None:
+                self._entries.move_to_end( key )
+                return info
+
+        if key in self._index:
+            offset, size = self._index[ key ]
+            info = pickle.loads( self._mmap[ offset:offset + size ] )
+        else:
+            info = LineInfo( length, key[ 1 ] )
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[ key ] = info
+                self._weight += info.weight
+                while self._weight > self._capacity and len( self._entries ) > 1:
+                    _, evicted = self._entries.popitem( last=False )
+                    self._weight -= evicted.weight
+
+        return info
+
+    def clear( self ) -> None:
+        """ Dropping all the entries kept in memory
+
+        :return: None
+        :rtype: None
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def save( self, path: str ) -> None:
+        """ Saving the entries in memory, plus the ones of the attached file, on a file that can be attached later
+
+        :param path: Path of the file
+        :type path: str
+        :return: None
+        :rtype: None
+        """
+
+        with self._lock:
+            entries = dict( self._entries )
+        for key in self._index:
+            if key not in entries:
+                entries[ key ] = self.get( *key )
+
+        blobs = [ ( key, pickle.dumps( info, pickle.HIGHEST_PROTOCOL ) ) for key, info in entries.items() ]
+        # Offsets are relative to the end of the index, whose size is only known once it has been serialized
+        index = {}
+        offset = 0
+        for key, blob in blobs:
+            index[ key ] = ( offset, len( blob ) )
+            offset += len( blob )
+        index_blob = pickle.dumps( index, pickle.HIGHEST_PROTOCOL )
+
+        with open( path, "wb" ) as table_file:
+            table_file.write( FILE_HEADER.pack( FILE_MAGIC, len( index_blob ) ) )
+            table_file.write( index_blob )
+            for _, blob in blobs:
+                table_file.write( blob )
+
+    def attach( self, path: str ) -> None:
+        """ Memory-mapping a file written by :meth:`save`, the entries are read from it when missing from memory
+
+        :param path: Path of the file
+        :type path: str
+        :return: None
+        :rtype: None
+
+        :raises ValueError: error raised when the file is not a line table
+        """
+
+        with open( path, "rb" ) as table_file:
+            table_map = mmap.mmap( table_file.fileno(), 0, access=mmap.ACCESS_READ )
+
+        magic, index_size = FILE_HEADER.unpack_from( table_map, 0 )
+        if magic != FILE_MAGIC:
+            table_map.close()
+            raise ValueError( "{} is not a line table".format( path ) )
+
+        start = FILE_HEADER.size + index_size
+        index = pickle.loads( table_map[ FILE_HEADER.size:start ] )
+        self._index = { key: ( offset + start, size ) for key, ( offset, size ) in index.items() }
+        self._mmap = table_map
+
+
+# Table shared by all the engines of the current process
+LINES = LineTable()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FUNCTIONS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def _restore_info( *values ) -> LineInfo:
+    """ Rebuilding a :class:`LineInfo` from the values pickled by :meth:`LineInfo.__reduce__`
+
+    :return: The rebuilt information
+    :rtype: LineInfo
+    """
+
+    info = LineInfo.__new__( LineInfo )
+    ( info._length,
+      info._constraint,
+      info._colours,
+      info._count,
+      info._placements,
+      info._leftmost,
+      info._rightmost,
+      info._forced,
+      info._automaton ) = values
+
+    return info
+
+
+def canonical_constraint( constraint ) -> Tuple:
+    """ Normalising a constraint, so that equivalent constraints share the same entry of a table
+
+    Empty blocks are removed and, if all the blocks are black, the constraint is made of plain lengths, otherwise of
+    ( length, colour ) pairs.
+
+    :param constraint: Sequence of blocks, either lengths of black blocks or ( length, colour ) pairs
+    :return: The canonical constraint
+    :rtype: Tuple
+    """
+
+    blocks = [ ( int( block ), 1 ) if isinstance( block, int ) else ( int( block[ 0 ] ), int( block[ 1 ] ) )
+               for block in constraint ]
+    blocks = [ block for block in blocks if block[ 0 ] > 0 ]
+    if all( colour == 1 for _, colour in blocks ):
+        return tuple( length for length, _ in blocks )
+
+    return tuple( blocks )
+
+
+def line_info( length: int, constraint ) -> LineInfo:
+    """ Retrieving the information of a line from the table shared by all the engines
+
+    :param length: Length of the line
+    :type length: int
+    :param constraint: Constraint of the line
+    :return: The information of the line
+    :rtype: LineInfo
+    """
+
+    return LINES.get( length, constraint )
+
+
+def span( start: int, end: int ) -> int:
+    """ Mask of the cells from start, included, to end, excluded
+
+    :param start: First cell of the span
+    :type start: int
+    :param end: Cell following the last one of the span
+    :type end: int
+    :return: The mask of the span
+    :rtype: int
+    """
+
+    return ( ( 1 << ( end - start ) ) - 1 ) << start
+
+
+def settle_line( blocks: List[ Tuple[ int, int ] ], line: List[ int ] ) -> Optional[ List[ int ] ]:
+    """ Deducing every cell of a line that has the same value in all the placements of its blocks
+
+    A dynamic programming over (cell, block) pairs first computes which suffixes of the line can still host the
+    remaining blocks, then a forward pass over the reachable pairs collects the values each cell can take.
+
+    :param blocks: ( length, colour ) of the blocks of the line
+    :type blocks: List[ Tuple[ int, int ] ]
+    :param line: Current values of the line, either UNKNOWN, EMPTY or a colour
+    :type line: List[ int ]
+    :return: The settled line, None if no placement is compatible with the current values
+    :rtype: Optional[ List[ int ] ]
+    """
+
+    length = len( line )
+    count = len( blocks )
+
+    # Number of cells that cannot take each colour before each position, to check in constant time if a block fits
+    clashes_before = {}
+    for colour in { colour for _, colour in blocks }:
+        clashes = [ 0 ] * ( length + 1 )
+        for i, value in enumerate( line ):
+            clashes[ i + 1 ] = clashes[ i ] + ( value != UNKNOWN and value != colour )
+        clashes_before[ colour ] = clashes
+
+    def block_next( i: int, j: int ) -> Optional[ int ]:
+        # Position following block j placed at cell i, including its mandatory gap, None if the block does not fit
+        block, colour = blocks[ j ]
+        end = i + block
+        if end > length or clashes_before[ colour ][ end ] != clashes_before[ colour ][ i ]:
+            return None
+        if end == length or ( j + 1 < count and blocks[ j + 1 ][ 1 ] != colour ):
+            return end
+        if line[ end ] != UNKNOWN and line[ end ] != EMPTY:
+            return None
+        return end + 1
+
+    # fits[ i ][ j ]: cells from i onwards can host the blocks from j onwards
+    fits = [ [ False ] * ( count + 1 ) for _ in range( length + 2 ) ]
+    fits[ length ][ count ] = True
+    for i in range( length - 1, -1, -1 ):
+        for j in range( count, -1, -1 ):
+            if line[ i ] in [ UNKNOWN, EMPTY ] and fits[ i + 1 ][ j ]:
+                fits[ i ][ j ] = True
+            elif j < count:
+                following = block_next( i, j )
+                fits[ i ][ j ] = following is not None and fits[ following ][ j + 1 ]
+
+    if not fits[ 0 ][ 0 ]:
+        return None
+
+    can_empty = [ False ] * length
+    can_colour = [ set() for _ in range( length ) ]
+    reached = [ [ False ] * ( count + 1 ) for _ in range( length + 2 ) ]
+    reached[ 0 ][ 0 ] = True
+    for i in range( length ):
+        for j in range( count + 1 ):
+            if not reached[ i ][ j ]:
+                continue
+            if line[ i ] in [ UNKNOWN, EMPTY ] and fits[ i + 1 ][ j ]:
+                can_empty[ i ] = True
+                reached[ i + 1 ][ j ] = True
+            if j < count:
+                following = block_next( i, j )
+                if following is not None and fits[ following ][ j + 1 ]:
+                    block, colour = blocks[ j ]
+                    for k in range( i, i + block ):
+                        can_colour[ k ].add( colour )
+                    if following > i + block:
+                        can_empty[ i + block ] = True
+                    reached[ following ][ j + 1 ] = True
+
+    return [ next( iter( can_colour[ i ] ) ) if not can_empty[ i ] and len( can_colour[ i ] ) == 1
+             else ( EMPTY if not can_colour[ i ] else UNKNOWN )
+             for i in range( length ) ]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ MAIN ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+
+def main():
+    # region Command Line arguments
+    # Reading arguments from command line
+    arg_parser = argparse.ArgumentParser( description="Precomputing the line table of a corpus of puzzles" )
+    arg_parser.add_argument( "puzzles", help="File of puzzles, one JSON object with size, rows and columns per line" )
+    arg_parser.add_argument( "output", help="Path of the line table to write" )
+
+    input_args = vars( arg_parser.parse_args() )
+    # endregion
+
+    # Importing the table from the module, pickling the entries with a reference to it instead of __main__
+    from nonogram_lines import LineTable as ModuleLineTable
+
+    table = ModuleLineTable( capacity=1 << 62 )
+    with open( input_args[ "puzzles" ] ) as puzzles:
+        for line in puzzles:
+            if not line.strip():
+                continue
+            puzzle = json.loads( line )
+            for constraint in puzzle[ "rows" ] + puzzle[ "columns" ]:
+                table.get( puzzle[ "size" ], constraint )
+
+    table.save( input_args[ "output" ] )
+    print( "{} lines saved on {}".format( len( table ), input_args[ "output" ] ) )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# -----------------------------------------------------------------------------
+# Copyright(c) 2017-2020 United Technologies Research Center Ireland Limited.
+# This document/file and its contents are property of United Technologies Research
+# Center Ireland Limited. You may not possess, use, copy or disclose this
+# document/file or any information in it, for any purpose without United Technologies
+# Research Center Ireland Limited’s express written permission. Neither receipt
+# nor possession of this document/file alone, from any source, constitutes such
+# permission. Possession, use, copying or disclosure by anyone without UTRC-I
+# express written permission is not authorized and may result in criminal and/or
+# civil liability.
+#
+# All rights reserved.
+#
+# Classification: EU ECCN: NSR, US ECCN: EAR99
+# -----------------------------------------------------------------------------
+#
+# Author: Riccardo Orizio
+# Date: Thu 02 Jan 2020
+# Description: Portfolio solver racing the CP model against the native backtracking engine
+#
+
+
+import json
+import threading
+import time
+
+from ortools.sat.python import cp_model
+from typing import Dict, TextIO
+
+from nonogram_backtrack import solve_backtrack
+from nonogrammeroo import NonogramBoard
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CLASSES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class PortfolioStats:
+    """ Record of the engines winning the races, used to tune which engine should be tried on which board
+
+    :ivar _wins: (Dict[ int, Dict[ str, int ] ]) Number of wins of each engine, grouped by board size
+    :ivar _log: (TextIO) Stream on which every race is appended as a JSON line, nothing is logged if None
+    :ivar _lock: (threading.Lock) Lock protecting the record from concurrent races
+    """
+
+    def __init__( self, log: TextIO = None ):
+        self._wins = {}
+        self._log = log
+        self._lock = threading.Lock()
+
+    @property
+    def wins( self ) -> Dict[ int, Dict[ str, int ] ]:
+        return self._wins
+
+    @property
+    def log( self ) -> TextIO:
+        return self._log
+
+    @log.setter
+    def log( self, log: TextIO ):
+        with self._lock:
+            self._log = log
+
+    def record( self, size: int, engine: str, status: str, elapsed: float ) -> None:
+        """ Recording the outcome of a race
+
+        :param size: Size of the board raced on
+        :type size: int
+        :param engine: Name of the winning engine
+        :type engine: str
+        :param status: Status reported by the winning engine
+        :type status: str
+        :param elapsed: Seconds taken by the winning engine
+        :type elapsed: float
+        :return: None
+        :rtype: None
+        """
+
+        with self._lock:
+            size_wins = self._wins.setdefault( size, {} )
+            size_wins[ engine ] = size_wins.get( engine, 0 ) + 1
+            if self._log is not None:
+                self._log.write( json.dumps( { "size": size, "engine": engine, "status": status, "time": elapsed } ) )
+                self._log.write( "\n" )
+                self._log.flush()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CONSTANTS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+# Record of the current process, the service workers log it with --portfolio-log
+STATS = PortfolioStats()
+# Statuses settling a board, an engine ending with any other status has not won the race, unless it ended FEASIBLE
+# because it reached its maximum number of solutions
+CONCLUSIVE_STATUSES = [ "OPTIMAL", "INFEASIBLE" ]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FUNCTIONS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def is_conclusive( board: NonogramBoard ) -> bool:
+    """ Checking if the last solve of a board settled it, a FEASIBLE status being also reported on a time limit
+
+    :param board: Board solved by either engine
+    :type board: NonogramBoard
+    :return: True if the engine found all the solutions, proved there are none or reached its maximum number of
+        solutions
+    :rtype: bool
+    """
+
+    return board.status in CONCLUSIVE_STATUSES or ( board.status == "FEASIBLE" and board.capped )
+
+
+def solve_portfolio( board: NonogramBoard,
+                     time_limit: float = None,
+                     stats: PortfolioStats = STATS,
+                     max_solutions: int = None ) -> str:
+    """ Solving the board with the CP model and the native engine at the same time, keeping the first to settle it
+
+    The CP solver runs on a separate thread, since it releases the GIL while searching, and is stopped as soon as
+    the native engine finishes with a conclusive status; the native engine is stopped in turn as soon as the CP
+    solver does. An engine ending without a conclusive status, e.g. on its time limit, waits for the other one; if
+    neither settles the board, the results of the CP solver are kept and no winner is recorded.
+
+    :param board: Board to solve, it receives the solutions of the winning engine
+    :type board: NonogramBoard
+    :param time_limit: Maximum number of seconds given to each engine, no limit if None
+    :type time_limit: float
+    :param stats: Record on which the winning engine is saved, nothing is recorded if None
+    :type stats: PortfolioStats
+    :param max_solutions: Number of solutions after which each engine stops its search, no limit if None
+    :type max_solutions: int
+    :return: Name of the winning engine
+    :rtype: str
+    """
+
+    start = time.perf_counter()
+    # Each engine works on its own copy, the loser might still be writing its results when the race ends
+    cp_board = NonogramBoard.from_dict( board.to_dict() )
+    native_board = NonogramBoard.from_dict( board.to_dict() )
+    cp_solver = cp_model.CpSolver()
+    native_stop = threading.Event()
+
+    lock = threading.Lock()
+    winner = []
+
+    def finish( candidate: NonogramBoard ) -> None:
+        with lock:
+            if not winner:
+                winner.append( ( candidate, time.perf_counter() - start ) )
+
+    def run_cp() -> None:
+        cp_board.solve( time_limit, cp_solver, max_solutions )
+        if is_conclusive( cp_board ):
+            finish( cp_board )
+            native_stop.set()
+
+    cp_thread = threading.Thread( target=run_cp, daemon=True )
+    cp_thread.start()
+
+    solve_backtrack( native_board, time_limit, native_stop, max_solutions )
+    if is_conclusive( native_board ):
+        finish( native_board )
+        # Stopping repeatedly, a stop sent before the CP solver starts its search would be lost
+        while cp_thread.is_alive():
+            cp_solver.StopSearch()
+            cp_thread.join( 0.01 )
+    else:
+        cp_thread.join()
+
+    result, elapsed = winner[ 0 ] if winner else ( cp_board, None )
+    board.solutions = result.solutions
+    board.grids = result.grids
+    board.status = result.status
+    board.engine = result.engine
+    board.capped = result.capped
+    if stats is not None and winner:
+        stats.record( board.size, board.engine, board.status, elapsed )
+
+    return board.engine
@@ -0,0 +1,253 @@
+# -----------------------------------------------------------------------------
+# Copyright(c) 2017-2020 United Technologies Research Center Ireland Limited.
+# This document/file and its contents are property of United Technologies Research
+# Center Ireland Limited. You may not possess, use, copy or disclose this
+# document/file or any information in it, for any purpose without United Technologies
+# Research Center Ireland Limited’s express written permission. Neither receipt
+# nor possession of this document/file alone, from any source, constitutes such
+# permission. Possession, use, copying or disclosure by anyone without UTRC-I
+# express written permission is not authorized and may result in criminal and/or
+# civil liability.
+#
+# All rights reserved.
+#
+# Classification: EU ECCN: NSR, US ECCN: EAR99
+# -----------------------------------------------------------------------------
+#
+# Author: Riccardo Orizio
+# Date: Thu 02 Jan 2020
+# Description: Rendering and export of boards and solutions
+#
+# Three formats are available:
+#   - text: the human-oriented layout of NonogramBoard.print, constraints included
+#   - pbm: raw PBM images with packed bits, one image per solution, full cells being black whatever their colour
+#   - rle: one line per solution, rows separated by "/" and made of runs "<count><symbol>", the count being omitted
+#     for runs of a single cell, e.g. "3_2O/O_O_O"
+#
+
+
+import io
+import re
+
+from typing import BinaryIO, List, TextIO
+
+from nonogrammeroo import CELL_UNKNOWN, Cell, NonogramBoard, cell_symbol, clue_text, symbol_colour
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CONSTANTS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+RLE_ROW_SEPARATOR = "/"
+RLE_RUN = re.compile( r"(\d*)(\D)" )
+
+FORMAT_TEXT = "text"
+FORMAT_PBM = "pbm"
+FORMAT_RLE = "rle"
+# File extension of each format
+FORMATS = { FORMAT_TEXT: "txt", FORMAT_PBM: "pbm", FORMAT_RLE: "rle" }
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CLASSES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class BoardLayout:
+    """ Text layout of a board, computed once and reused for every grid of cells printed with it
+
+    :ivar _size: (int) Mono-dimensional size of the board
+    :ivar _header: (str) Column constraints and divider, ready to be written
+    :ivar _row_prefixes: (List[ str ]) Row constraint and separator preceding the cells of each row
+    :ivar _symbols: (List[ str ]) Padded symbol of each colour, the empty cell first
+    :ivar _unknown: (str) Padded symbol of the cells whose value is not known
+    """
+
+    def __init__( self, board: NonogramBoard ):
+        self._size = board.size
+        rows = [ region.constraint for region in board.rows ]
+        columns = [ region.constraint for region in board.columns ]
+        row_texts = [ " ".join( [ clue_text( el ) for el in constraint ] ) for constraint in rows ]
+
+        # Fancy spaces for the constraints
+        left_space = max( [ len( constraint ) * 2 for constraint in rows + columns ] +
+                          [ len( text ) for text in row_texts ] )
+        table_space = max( [ len( clue_text( el ) ) for constraint in columns for el in constraint ] + [ 1 ] )
+
+        # Column constraints, aligned to the bottom so that they end close to the board
+        header = io.StringIO()
+        max_constraint = max( [ len( constraint ) for constraint in columns ] )
+        for index in range( max_constraint ):
+            header.write( "{msg:{space}} | ".format( msg="", space=left_space ) )
+            for constraint in columns:
+                shift = max_constraint - len( constraint )
+                msg = clue_text( constraint[ index - shift ] ) if index >= shift else " "
+                header.write( "{msg:>{table_space}} ".format( msg=msg, table_space=table_space ) )
+            header.write( "\n" )
+
+        # Divider
+        header.write( "{}\n".format( "-" * ( left_space + self._size * ( table_space + 1 ) + 3 ) ) )
+
+        self._header = header.getvalue()
+        self._row_prefixes = [ "{constraint:>{space}} | ".format( constraint=text, space=left_space )
+                               for text in row_texts ]
+        coloured = board.colours > 1
+        self._symbols = [ "{msg:>{space}}".format( msg=cell_symbol( colour, coloured ), space=table_space )
+                          for colour in range( board.colours + 1 ) ]
+        self._unknown = "{msg:>{space}}".format( msg=CELL_UNKNOWN, space=table_space )
+
+    def write( self, stream: TextIO, data: List[ List[ Cell ] ], mark_unknown: bool = False ) -> None:
+        """ Writing the board with the given cells
+
+        :param stream: Stream on which the board is written
+        :type stream: TextIO
+        :param data: Cells of the board
+        :type data: List[ List[ Cell ] ]
+        :param mark_unknown: Whether the cells whose value is not known are written as CELL_UNKNOWN, the cells of
+            solutions are written by their colour regardless
+        :type mark_unknown: bool
+        :return: None
+        :rtype: None
+        """
+
+        symbols = self._symbols
+        stream.write( self._header )
+        for prefix, row in zip( self._row_prefixes, data ):
+            stream.write( prefix )
+            stream.write( " ".join( [ symbols[ cell.colour ] if cell.known or not mark_unknown else self._unknown
+                                      for cell in row ] ) )
+            stream.write( "\n" )
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FUNCTIONS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def write_text( board: NonogramBoard, stream: TextIO, data: List[ List[ Cell ] ] = None ) -> None:
+    """ Writing the board as :meth:`NonogramBoard.print` formats it
+
+    :param board: Board to write
+    :type board: NonogramBoard
+    :param stream: Stream on which the board is written
+    :type stream: TextIO
+    :param data: Cells of the board, the cells of the board itself with its title if None, unknown cells being
+        written as CELL_UNKNOWN
+    :type data: List[ List[ Cell ] ]
+    :return: None
+    :rtype: None
+    """
+
+    mark_unknown = data is None
+    if data is None:
+        data = board.board
+        stream.write( " *** Nonogram {}x{} board ***\n\n".format( board.size, board.size ) )
+
+    BoardLayout( board ).write( stream, data, mark_unknown )
+
+
+def write_solutions_text( board: NonogramBoard, stream: TextIO ) -> None:
+    """ Writing all the solutions of the board as :meth:`NonogramBoard.print_solutions` formats them
+
+    :param board: Solved board
+    :type board: NonogramBoard
+    :param stream: Stream on which the solutions are written
+    :type stream: TextIO
+    :return: None
+    :rtype: None
+    """
+
+    layout = BoardLayout( board )
+    for index, grid in enumerate( board.grids, start=1 ):
+        stream.write( " === Solution {} ===\n\n".format( index ) )
+        layout.write( stream, grid )
+
+
+def write_pbm( grid: List[ List[ Cell ] ], stream: BinaryIO ) -> None:
+    """ Writing a grid of cells as a raw PBM image, full cells being black
+
+    :param grid: Cells to write
+    :type grid: List[ List[ Cell ] ]
+    :param stream: Binary stream on which the image is written
+    :type stream: BinaryIO
+    :return: None
+    :rtype: None
+    """
+
+    width = len( grid[ 0 ] ) if grid else 0
+    row_bytes = ( width + 7 ) // 8
+    # Padding each row to whole bytes, the bits of a row being read from the most significant one
+    padding = "0" * ( row_bytes * 8 - width )
+
+    stream.write( "P4\n{} {}\n".format( width, len( grid ) ).encode( "ascii" ) )
+    stream.write( b"".join( [ int( "".join( [ "1" if cell.value else "0" for cell in row ] ) + padding, 2 ).to_bytes(
+            row_bytes, "big" ) for row in grid ] ) )
+
+
+def run_length( grid: List[ List[ Cell ] ], coloured: bool = False ) -> str:
+    """ Encoding a grid of cells as a run-length string
+
+    :param grid: Cells to encode
+    :type grid: List[ List[ Cell ] ]
+    :param coloured: True if the grid belongs to a multi-colour board
+    :type coloured: bool
+    :return: The encoded grid
+    :rtype: str
+    """
+
+    rows = []
+    for row in grid:
+        runs = []
+        count = 0
+        for index, cell in enumerate( row ):
+            count += 1
+            if index + 1 == len( row ) or row[ index + 1 ].colour != cell.colour:
+                runs.append( "{}{}".format( count if count > 1 else "", cell_symbol( cell.colour, coloured ) ) )
+                count = 0
+        rows.append( "".join( runs ) )
+
+    return RLE_ROW_SEPARATOR.join( rows )
+
+
+def parse_run_length( text: str ) -> List[ List[ Cell ] ]:
+    """ Decoding a run-length string, i.e. the inverse of :func:`run_length`
+
+    :param text: Encoded grid
+    :type text: str
+    :return: The cells of the grid
+    :rtype: List[ List[ Cell ] ]
+    """
+
+    grid = []
+    for encoded in text.strip().split( RLE_ROW_SEPARATOR ):
+        row = []
+        for count, symbol in RLE_RUN.findall( encoded ):
+            row.extend( [ Cell( colour=symbol_colour( symbol ) ) ] * int( count or 1 ) )
+        grid.append( row )
+
+    return grid
+
+
+def export_solutions( board: NonogramBoard, stream: BinaryIO, output_format: str = FORMAT_RLE ) -> None:
+    """ Writing all the solutions of the board in the given format
+
+    :param board: Solved board
+    :type board: NonogramBoard
+    :param stream: Binary stream on which the solutions are written
+    :type stream: BinaryIO
+    :param output_format: One of FORMAT_TEXT, FORMAT_PBM or FORMAT_RLE
+    :type output_format: str
+    :return: None
+    :rtype: None
+
+    :raises ValueError: error raised when the format is unknown
+    """
+
+    if output_format == FORMAT_PBM:
+        for grid in board.grids:
+            write_pbm( grid, stream )
+        return
+
+    text = io.TextIOWrapper( stream, encoding="utf-8", newline="\n", write_through=True )
+    try:
+        if output_format == FORMAT_TEXT:
+            write_solutions_text( board, text )
+        elif output_format == FORMAT_RLE:
+            coloured = board.colours > 1
+            for grid in board.grids:
+                text.write( run_length( grid, coloured ) )
+                text.write( "\n" )
+        else:
+            raise ValueError( "Unknown format {}, expected one of {}".format( output_format, ", ".join( FORMATS ) ) )
+    finally:
+        # Leaving the underlying stream open for the caller
+        text.detach()
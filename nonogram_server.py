@@ -0,0 +1,455 @@
+# -----------------------------------------------------------------------------
+# Copyright(c) 2017-2020 United Technologies Research Center Ireland Limited.
+# This document/file and its contents are property of United Technologies Research
+# Center Ireland Limited. You may not possess, use, copy or disclose this
+# document/file or any information in it, for any purpose without United Technologies
+# Research Center Ireland Limited’s express written permission. Neither receipt
+# nor possession of this document/file alone, from any source, constitutes such
+# permission. Possession, use, copying or disclosure by anyone without UTRC-I
+# express written permission is not authorized and may result in criminal and/or
+# civil liability.
+#
+# All rights reserved.
+#
+# Classification: EU ECCN: NSR, US ECCN: EAR99
+# -----------------------------------------------------------------------------
+#
+# Author: Riccardo Orizio
+# Date: Thu 02 Jan 2020
+# Description: Long-lived solver service speaking a JSON-lines protocol
+#
+# Each request is a single JSON object on its own line, e.g.
+#   { "id": 1, "size": 2, "rows": [ [ 1 ], [ 2 ] ], "columns": [ [ 2 ], [ 1 ] ], "time_limit": 5, "engine": "cp-sat" }
+# and each reply is a single JSON object on its own line carrying the same "id", e.g.
+#   { "id": 1, "status": "OPTIMAL", "engine": "cp-sat", "solutions": [ [ "O_", "OO" ] ], "time": { ... } }
+# Known cells are given by "cells", e.g. [ "O?", "??" ], and "check": true only asks whether a solution exists, e.g.
+#   { "id": 2, "size": 2, "rows": [ [ 1 ], [ 2 ] ], "columns": [ [ 2 ], [ 1 ] ], "cells": [ "_?", "??" ], "check": true }
+# is answered by
+#   { "id": 2, "solvable": false, "time": { ... } }
+# At most "max_solutions" solutions are returned, capped by the server, the status being FEASIBLE when the search
+# stopped there. Replies are sent as soon as they are ready, so they might not follow the order of the requests.
+#
+
+
+import argparse
+import json
+import multiprocessing
+import multiprocessing.synchronize
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from typing import BinaryIO, Callable, Dict, List, Union
+
+from nonogram_backtrack import ENGINE_NAME as ENGINE_BACKTRACK, solve_backtrack
+from nonogram_lines import LINES
+from nonogram_portfolio import STATS, solve_portfolio
+from nonogrammeroo import ENGINE_CP_SAT, NonogramBoard, cell_symbol
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CONSTANTS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+DEFAULT_TIME_LIMIT = 10.0
+DEFAULT_MAX_SOLUTIONS = 100
+STATUS_ERROR = "ERROR"
+
+ENGINE_PORTFOLIO = "portfolio"
+ENGINES = { ENGINE_CP_SAT: lambda board, time_limit, max_solutions: board.solve( time_limit,
+                                                                                max_solutions=max_solutions ),
+            ENGINE_BACKTRACK: lambda board, time_limit, max_solutions: solve_backtrack( board,
+                                                                                        time_limit,
+                                                                                        max_solutions=max_solutions ),
+            ENGINE_PORTFOLIO: lambda board, time_limit, max_solutions: solve_portfolio( board,
+                                                                                        time_limit,
+                                                                                        max_solutions=max_solutions ) }
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CLASSES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class NonogramServer:
+    """ Solver service dispatching the incoming requests to a pool of warm worker processes
+
+    :ivar _time_limit: (float) Maximum number of seconds a single request is allowed to run the solver for
+    :ivar _max_solutions: (int) Maximum number of solutions returned by a single request
+    :ivar _engine: (str) Engine used for the requests not asking for a specific one
+    :ivar _pool: (multiprocessing.pool.Pool) Worker processes, all of them warmed up before the server is created
+    :ivar _slots: (threading.BoundedSemaphore) Requests allowed in flight, readers block when none is left
+    :ivar _max_pending: (int) Replies of a single stream allowed to wait for being written
+    """
+
+    def __init__( self,
+                  workers: int = None,
+                  max_pending: int = None,
+                  time_limit: float = DEFAULT_TIME_LIMIT,
+                  engine: str = ENGINE_CP_SAT,
+                  line_table: str = None,
+                  max_solutions: int = DEFAULT_MAX_SOLUTIONS,
+                  portfolio_log: str = None ):
+        workers = workers or os.cpu_count() or 1
+        self._time_limit = time_limit
+        self._max_solutions = max_solutions
+        self._engine = engine
+        # Spawning instead of forking since the pool lives next to the threads serving the connections
+        context = multiprocessing.get_context( "spawn" )
+        ready = context.Semaphore( 0 )
+        self._pool = context.Pool( workers, initializer=warm_up, initargs=( line_table, portfolio_log, ready ) )
+        # Waiting for every worker to be warm, otherwise the first requests would pay their start-up
+        for _ in range( workers ):
+            ready.acquire()
+        self._max_pending = max_pending or 2 * workers
+        self._slots = threading.BoundedSemaphore( self._max_pending )
+
+    @property
+    def time_limit( self ) -> float:
+        return self._time_limit
+
+    @property
+    def max_solutions( self ) -> int:
+        return self._max_solutions
+
+    @property
+    def engine( self ) -> str:
+        return self._engine
+
+    def submit( self, request: Dict, reply: Callable[ [ Dict ], None ] ) -> None:
+        """ Scheduling a request on the worker pool, blocking while too many requests are already in flight
+
+        :param request: Decoded request
+        :type request: Dict
+        :param reply: Function invoked with the reply once the request has been handled, from the result thread of
+            the pool, hence it must not block
+        :type reply: Callable[ [ Dict ], None ]
+        :return: None
+        :rtype: None
+        """
+
+        request_id = request.get( "id" )
+        # Capping the time limit requested by the client to the one of the server
+        time_limit = min( float( request.get( "time_limit", self.time_limit ) ), self.time_limit )
+        max_solutions = min( int( request.get( "max_solutions", self.max_solutions ) ), self.max_solutions )
+        if max_solutions < 1:
+            raise ValueError( "max_solutions must be at least 1" )
+        engine = request.get( "engine", self.engine )
+        if engine not in ENGINES:
+            raise ValueError( "Unknown engine {}, expected one of {}".format( engine, ", ".join( ENGINES ) ) )
+        queued = time.perf_counter()
+
+        def on_result( result: Dict ) -> None:
+            self._slots.release()
+            result[ "id" ] = request_id
+            result[ "time" ][ "total" ] = time.perf_counter() - queued
+            reply( result )
+
+        def on_error( error: BaseException ) -> None:
+            self._slots.release()
+            reply( error_reply( request_id, error ) )
+
+        self._slots.acquire()
+        self._pool.apply_async( solve_request,
+                                ( request, time_limit, engine, max_solutions ),
+                                callback=on_result,
+                                error_callback=on_error )
+
+    def serve_stream( self, rfile: BinaryIO, wfile: BinaryIO ) -> None:
+        """ Handling the JSON-lines requests read from a stream until it is closed
+
+        :param rfile: Stream from which the requests are read
+        :type rfile: BinaryIO
+        :param wfile: Stream on which the replies are written
+        :type wfile: BinaryIO
+        :return: None
+        :rtype: None
+        """
+
+        replies = queue.Queue()
+        pending = threading.Condition()
+        in_flight = [ 0 ]
+
+        def write_replies() -> None:
+            # Only this thread writes on the stream, so that a client not reading its replies blocks nobody else
+            while True:
+                result = replies.get()
+                if result is None:
+                    return
+                try:
+                    wfile.write( ( json.dumps( result, separators=( ",", ":" ) ) + "\n" ).encode( "utf-8" ) )
+                    wfile.flush()
+                except OSError:
+                    # The client went away, nobody is left to read the reply
+                    pass
+                with pending:
+                    in_flight[ 0 ] -= 1
+                    pending.notify_all()
+
+        writer = threading.Thread( target=write_replies, daemon=True )
+        writer.start()
+
+        for line in rfile:
+            if not line.strip():
+                continue
+
+            with pending:
+                # Reading no further request while too many replies of this stream are still to be written
+                pending.wait_for( lambda: in_flight[ 0 ] < self._max_pending )
+                in_flight[ 0 ] += 1
+
+            request = None
+            try:
+                request = json.loads( line )
+                if not isinstance( request, dict ):
+                    raise ValueError( "A request must be a JSON object" )
+                self.submit( request, replies.put )
+            except ( TypeError, ValueError ) as error:
+                replies.put( error_reply( request.get( "id" ) if isinstance( request, dict ) else None, error ) )
+
+        # Waiting for the replies of this stream before letting it go
+        with pending:
+            pending.wait_for( lambda: in_flight[ 0 ] == 0 )
+        replies.put( None )
+        writer.join()
+
+    def serve_socket( self, address: str ) -> None:
+        """ Serving the clients connecting on a local socket, one thread per connection
+
+        :param address: Either "host:port" for a TCP socket or the path of a Unix domain socket
+        :type address: str
+        :return: None
+        :rtype: None
+        """
+
+        if ":" in address:
+            host, port = address.rsplit( ":", 1 )
+            server = _ThreadingTCPServer( ( host, int( port ) ), _StreamHandler )
+        else:
+            if os.path.exists( address ):
+                os.unlink( address )
+            server = _ThreadingUnixServer( address, _StreamHandler )
+
+        server.nonogram_server = self
+        with server:
+            server.serve_forever()
+
+    def close( self ) -> None:
+        """ Stopping the worker processes
+
+        :return: None
+        :rtype: None
+        """
+
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.close()
+
+
+class _StreamHandler( socketserver.StreamRequestHandler ):
+    """ Connection handler forwarding the stream of the client to the nonogram server """
+
+    def handle( self ) -> None:
+        self.server.nonogram_server.serve_stream( self.rfile, self.wfile )
+
+
+class _ThreadingTCPServer( socketserver.ThreadingTCPServer ):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _ThreadingUnixServer( socketserver.ThreadingUnixStreamServer ):
+    daemon_threads = True
+
+
+class NonogramClient:
+    """ Minimal blocking client of a :class:`NonogramServer` listening on a local socket
+
+    :ivar _socket: (socket.socket) Connection to the server
+    :ivar _rfile: (BinaryIO) Stream of the replies sent by the server
+    :ivar _next_id: (int) Identifier of the next request sent
+    """
+
+    def __init__( self, address: str = DEFAULT_ADDRESS ):
+        if ":" in address:
+            host, port = address.rsplit( ":", 1 )
+            self._socket = socket.create_connection( ( host, int( port ) ) )
+        else:
+            self._socket = socket.socket( socket.AF_UNIX, socket.SOCK_STREAM )
+            self._socket.connect( address )
+        self._rfile = self._socket.makefile( "rb" )
+        self._next_id = 0
+
+    def solve( self, board: Union[ NonogramBoard, Dict ], time_limit: float = None ) -> Dict:
+        """ Sending a board to the server and waiting for its reply
+
+        :param board: Either the board or its dictionary description
+        :type board: Union[ NonogramBoard, Dict ]
+        :param time_limit: Maximum number of seconds the solver is given, server default if None
+        :type time_limit: float
+        :return: The reply of the server
+        :rtype: Dict
+
+        :raises ConnectionError: error raised when the server closes the connection before replying
+        """
+
+        request = dict( board.to_dict() if isinstance( board, NonogramBoard ) else board )
+        request[ "id" ] = self._next_id
+        self._next_id += 1
+        if time_limit is not None:
+            request[ "time_limit" ] = time_limit
+
+        self._socket.sendall( ( json.dumps( request ) + "\n" ).encode( "utf-8" ) )
+        for line in self._rfile:
+            result = json.loads( line )
+            if result.get( "id" ) == request[ "id" ]:
+                return result
+
+        raise ConnectionError( "Connection closed by the server before replying" )
+
+    def close( self ) -> None:
+        self._rfile.close()
+        self._socket.close()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.close()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FUNCTIONS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def warm_up( line_table: str = None,
+             portfolio_log: str = None,
+             ready: multiprocessing.synchronize.Semaphore = None ) -> None:
+    """ Initialising a worker process by solving a trivial board, so that no request pays the start-up cost
+
+    :param line_table: Path of a line table saved by :meth:`nonogram_lines.LineTable.save`, shared by all the workers
+    :type line_table: str
+    :param portfolio_log: Path on which each worker appends the races of the portfolio engine, followed by the
+        identifier of the worker process
+    :type portfolio_log: str
+    :param ready: Semaphore released once the worker is warm
+    :type ready: multiprocessing.synchronize.Semaphore
+    :return: None
+    :rtype: None
+    """
+
+    if line_table is not None:
+        LINES.attach( line_table )
+    if portfolio_log is not None:
+        # One file per worker, so that concurrent races never interleave their lines
+        STATS.log = open( "{}.{}".format( portfolio_log, os.getpid() ), "a" )
+    NonogramBoard.from_dict( { "size": 1, "rows": [ [ 1 ] ], "columns": [ [ 1 ] ] } ).solve()
+    if ready is not None:
+        ready.release()
+
+
+def encode_grid( grid: List, coloured: bool = False ) -> List[ str ]:
+    """ Encoding a solution board as one string per row
+
+    :param grid: Board of cells
+    :type grid: List[ List[ Cell ] ]
+    :param coloured: True if the board is a multi-colour one
+    :type coloured: bool
+    :return: The rows of the board
+    :rtype: List[ str ]
+    """
+
+    return [ "".join( [ cell_symbol( cell.colour, coloured ) for cell in row ] ) for row in grid ]
+
+
+def error_reply( request_id, error: BaseException ) -> Dict:
+    """ Composing the reply of a request that could not be handled
+
+    :param request_id: Identifier of the failed request
+    :param error: Error raised while handling the request
+    :type error: BaseException
+    :return: The reply to send
+    :rtype: Dict
+    """
+
+    return { "id": request_id, "status": STATUS_ERROR, "error": "{}: {}".format( type( error ).__name__, error ) }
+
+
+def solve_request( request: Dict,
+                   time_limit: float,
+                   engine: str = ENGINE_CP_SAT,
+                   max_solutions: int = DEFAULT_MAX_SOLUTIONS ) -> Dict:
+    """ Solving a single request, executed inside the worker processes
+
+    :param request: Decoded request
+    :type request: Dict
+    :param time_limit: Maximum number of seconds given to the solver
+    :type time_limit: float
+    :param engine: Name of the engine solving the request, one of :data:`ENGINES`
+    :type engine: str
+    :param max_solutions: Number of solutions after which the search is stopped
+    :type max_solutions: int
+    :return: The reply, without the request identifier
+    :rtype: Dict
+    """
+
+    start = time.perf_counter()
+    board = NonogramBoard.from_dict( request )
+    if request.get( "check", False ):
+        return { "solvable": board.has_solution( time_limit ), "time": { "solve": time.perf_counter() - start } }
+
+    ENGINES[ engine ]( board, time_limit, max_solutions )
+
+    return { "status": board.status,
+             "engine": board.engine,
+             "solutions": [ encode_grid( grid, board.colours > 1 ) for grid in board.grids ],
+             "time": { "solve": time.perf_counter() - start } }
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ MAIN ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+
+
+def main():
+    # region Command Line arguments
+    # Reading arguments from command line
+    arg_parser = argparse.ArgumentParser( description="Nonogram solver service speaking JSON lines" )
+    arg_parser.add_argument( "--socket", dest="socket", default=None,
+                             help="Local address to listen on, either host:port or the path of a Unix socket. "
+                                  "Requests are read from stdin if not given" )
+    arg_parser.add_argument( "--workers", dest="workers", default=None, type=int,
+                             help="Number of worker processes, one per CPU by default" )
+    arg_parser.add_argument( "--max-pending", dest="max_pending", default=None, type=int,
+                             help="Requests accepted in flight before the readers stop, twice the workers by default" )
+    arg_parser.add_argument( "--time-limit", dest="time_limit", default=DEFAULT_TIME_LIMIT, type=float,
+                             help="Maximum number of seconds a single request can run the solver for" )
+    arg_parser.add_argument( "--engine", dest="engine", default=ENGINE_CP_SAT, choices=sorted( ENGINES ),
+                             help="Engine used for the requests not asking for a specific one" )
+    arg_parser.add_argument( "--line-table", dest="line_table", default=None,
+                             help="Line table precomputed by nonogram_lines.py, memory-mapped by all the workers" )
+    arg_parser.add_argument( "--max-solutions", dest="max_solutions", default=DEFAULT_MAX_SOLUTIONS, type=int,
+                             help="Maximum number of solutions a single request can return" )
+    arg_parser.add_argument( "--portfolio-log", dest="portfolio_log", default=None,
+                             help="Path on which the races of the portfolio engine are logged as JSON lines, "
+                                  "each worker appending to the path followed by its process identifier" )
+
+    input_args = vars( arg_parser.parse_args() )
+    # endregion
+
+    with NonogramServer( input_args[ "workers" ],
+                         input_args[ "max_pending" ],
+                         input_args[ "time_limit" ],
+                         input_args[ "engine" ],
+                         input_args[ "line_table" ],
+                         input_args[ "max_solutions" ],
+                         input_args[ "portfolio_log" ] ) as server:
+        if input_args[ "socket" ] is None:
+            server.serve_stream( sys.stdin.buffer, sys.stdout.buffer )
+        else:
+            try:
+                server.serve_socket( input_args[ "socket" ] )
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
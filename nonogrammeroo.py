@@ -21,16 +21,24 @@
 
 
 import argparse
+import io
+import time
 from math import sqrt
-from re import match
 
 from ortools.sat.python import cp_model
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
+
+from nonogram_lines import EMPTY, UNKNOWN, line_info
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CONSTANTS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 CELL_EMPTY = "_"
 CELL_FULL = "O"
+CELL_UNKNOWN = "?"
+# Symbols of the cells of multi-colour boards, colour 1 being "a"
+COLOUR_SYMBOLS = "abcdefghijklmnopqrstuvwxyz"
+
+ENGINE_CP_SAT = "cp-sat"
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ CLASSES ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
@@ -38,15 +46,27 @@ class Cell:
     """ Implementation of a cell of the Nonogram
 
     :ivar _value: (bool) The cell is either full (True) or empty (False)
+    :ivar _known: (bool) The value of the cell is given, e.g. it has been set by the player
+    :ivar _colour: (int) Colour of the cell, 0 if empty, 1 for black and white boards
     """
 
-    def __init__( self, value: bool = False ):
-        self._value = value
+    def __init__( self, value: bool = False, known: bool = False, colour: int = None ):
+        self._colour = colour if colour is not None else int( value )
+        self._value = self._colour != 0
+        self._known = known
 
     @property
     def value( self ) -> bool:
         return self._value
 
+    @property
+    def colour( self ) -> int:
+        return self._colour
+
+    @property
+    def known( self ) -> bool:
+        return self._known
+
 
 class Coordinates:
     """ Implementation of a cell coordinates inside the Nonogram table
@@ -77,7 +97,8 @@ class Region:
     .. note:: This class has been implemented in case regions with weird shapes are needed
 
     :ivar _region: (List[ Coordinates ]) Region of cells, will be used as either row or column
-    :ivar _constraint: (List[ int ]) Constraint to be applied on the region
+    :ivar _constraint: (List[ Union[ int, Tuple[ int, int ] ] ]) Constraint to be applied on the region, made of
+        either block lengths for black blocks or ( length, colour ) pairs for coloured ones
     """
 
     def __init__( self, indexes: List[ Coordinates ] ):
@@ -89,13 +110,17 @@ class Region:
         return self._region
 
     @property
-    def constraint( self ) -> List[ int ]:
+    def constraint( self ) -> List[ Union[ int, Tuple[ int, int ] ] ]:
         return self._constraint
 
     @constraint.setter
-    def constraint( self, constraint: List[ int ] ):
+    def constraint( self, constraint: List[ Union[ int, Tuple[ int, int ] ] ] ):
         self._constraint = constraint
 
+    @property
+    def blocks( self ) -> List[ Tuple[ int, int ] ]:
+        return [ ( el, 1 ) if isinstance( el, int ) else tuple( el ) for el in self.constraint ]
+
     def is_row( self ) -> bool:
         """ Method used to check if the current region is a row
 
@@ -115,7 +140,7 @@ class Region:
         return [ point.y for point in self.region ].count( self.region[ 0 ].y ) == len( self.region )
 
     def __str__( self ):
-        return "{} on {}".format( ",".join( [ str( el ) for el in self.constraint ] ),
+        return "{} on {}".format( ",".join( [ clue_text( el ) for el in self.constraint ] ),
                                   ",".join( [ str( point ) for point in self.region ] ) )
 
 
@@ -125,17 +150,74 @@ class NonogramBoard:
     :ivar _size: (int) Mono-dimensional size of the current board
     :ivar _board: (List[ List[ Cell ] ]) Current board size
     :ivar _regions: (List[ Region ]) List of constrained regions, i.e. rows and columns
+    :ivar _lines: (Dict[ str, List[ Region ] ]) Regions of the rows and of the columns, indexed by direction
     :ivar _solutions: (List[ List[ Tuple[ cp_model.IntVar, int ] ] ]): List of solutions found
+    :ivar _grids: (List[ List[ List[ Cell ] ] ]) Solutions found recomposed as boards of cells
+    :ivar _status: (str) Status of the last solve, None if the board has not been solved yet
+    :ivar _engine: (str) Name of the engine that produced the solutions, None if the board has not been solved yet
+    :ivar _capped: (bool) True if the last solve stopped because it reached its maximum number of solutions
+    :ivar _colours: (int) Number of colours of the constraints, computed on first use until a constraint changes
+    :ivar _model: (cp_model.CpModel) CP model of the constraints, reused until a constraint changes
+    :ivar _cp_cell: (List[ List[ cp_model.IntVar ] ]) CP variables of the cells of the model
+    :ivar _cp_region: (List[ cp_model.IntVar ]) CP variables of the regions of the model
+    :ivar _cp_literal: (Dict[ Tuple[ int, int, int ], cp_model.IntVar ]) Literals of the cells having a given colour
     """
 
     def __init__( self, size: int = 10 ):
         self._size = size
-        self._board = [ [ Cell() ] * size ] * size
+        self._board = [ [ Cell() for _ in range( size ) ] for _ in range( size ) ]
         self._regions = []
+        self._lines = { "row": [], "column": [] }
         for i in range( size ):
-            self.regions.append( Region( [ Coordinates( i, j ) for j in range( 0, size ) ] ) )
-            self.regions.append( Region( [ Coordinates( j, i ) for j in range( 0, size ) ] ) )
+            self._lines[ "row" ].append( Region( [ Coordinates( i, j ) for j in range( 0, size ) ] ) )
+            self._lines[ "column" ].append( Region( [ Coordinates( j, i ) for j in range( 0, size ) ] ) )
+            self.regions.append( self._lines[ "row" ][ -1 ] )
+            self.regions.append( self._lines[ "column" ][ -1 ] )
         self._solutions = []
+        self._grids = []
+        self._status = None
+        self._engine = None
+        self._capped = False
+        self._colours = None
+        self._model = None
+        self._cp_cell = []
+        self._cp_region = []
+        self._cp_literal = {}
+
+    @classmethod
+    def from_dict( cls, data: Dict ) -> "NonogramBoard":
+        """ Creating a board from its dictionary description, i.e. the inverse of :meth:`to_dict`
+
+        :param data: Description of the board with keys "size", "rows", "columns" and optionally "cells", coloured
+            blocks being [ length, colour ] pairs
+        :type data: Dict
+        :return: The board with all the constraints and known cells applied
+        :rtype: NonogramBoard
+
+        :raises ValueError: error raised when the number of constraints or cells does not match the board size
+        """
+
+        board = cls( int( data[ "size" ] ) )
+        for direction, key in [ ( "row", "rows" ), ( "column", "columns" ) ]:
+            constraints = data.get( key, [] )
+            if len( constraints ) != board.size:
+                raise ValueError( "Expected {} {} constraints, {} given".format( board.size, key, len( constraints ) ) )
+            for index, constraint in enumerate( constraints ):
+                board.constraint_of( direction,
+                                     index,
+                                     [ int( el ) if isinstance( el, int ) else ( int( el[ 0 ] ), int( el[ 1 ] ) )
+                                       for el in constraint ] )
+
+        cells = data.get( "cells" )
+        if cells is not None:
+            if len( cells ) != board.size or any( len( line ) != board.size for line in cells ):
+                raise ValueError( "Expected {0}x{0} cells".format( board.size ) )
+            for row, line in enumerate( cells ):
+                for col, value in enumerate( line ):
+                    if value != CELL_UNKNOWN:
+                        board.set_cell( row, col, symbol_colour( value ) )
+
+        return board
 
     @property
     def size( self ) -> int:
@@ -149,6 +231,20 @@ class NonogramBoard:
     def regions( self ) -> List[ Region ]:
         return self._regions
 
+    @property
+    def rows( self ) -> List[ Region ]:
+        return self._lines[ "row" ]
+
+    @property
+    def columns( self ) -> List[ Region ]:
+        return self._lines[ "column" ]
+
+    @property
+    def colours( self ) -> int:
+        if self._colours is None:
+            self._colours = max( [ colour for region in self.regions for _, colour in region.blocks ] + [ 1 ] )
+        return self._colours
+
     @property
     def solutions( self ) -> List[ List[ Tuple[ cp_model.IntVar, int ] ] ]:
         return self._solutions
@@ -157,6 +253,38 @@ class NonogramBoard:
     def solutions( self, solutions: List[ List[ Tuple[ cp_model.IntVar, int ] ] ] ):
         self._solutions = solutions
 
+    @property
+    def grids( self ) -> List[ List[ List[ Cell ] ] ]:
+        return self._grids
+
+    @grids.setter
+    def grids( self, grids: List[ List[ List[ Cell ] ] ] ):
+        self._grids = grids
+
+    @property
+    def status( self ) -> str:
+        return self._status
+
+    @status.setter
+    def status( self, status: str ):
+        self._status = status
+
+    @property
+    def engine( self ) -> str:
+        return self._engine
+
+    @engine.setter
+    def engine( self, engine: str ):
+        self._engine = engine
+
+    @property
+    def capped( self ) -> bool:
+        return self._capped
+
+    @capped.setter
+    def capped( self, capped: bool ):
+        self._capped = capped
+
     def constraint_of( self, direction: str, index: int, constraint: List[ int ] ) -> None:
         """ Applying the constraint to a specific region of the table
 
@@ -164,8 +292,8 @@ class NonogramBoard:
         :type direction: str
         :param index: Index of the region on which the current constraint has to be applied
         :type index: int
-        :param constraint: Constraint information
-        :type constraint: List[ int ]
+        :param constraint: Constraint information, either block lengths or ( length, colour ) pairs
+        :type constraint: List[ Union[ int, Tuple[ int, int ] ] ]
         :return: None
         :rtype: None
 
@@ -175,20 +303,99 @@ class NonogramBoard:
         if index not in range( 0, self.size ):
             raise IndexError( "Index out of the game board: {}, boundaries [ 0, {} ]".format( index, self.size ) )
 
-        if direction == "row":
-            selected = [ region for region in self.regions if region.is_row() and region.region[ 0 ].x == index ]
-        else:
-            selected = [ region for region in self.regions if region.is_column() and region.region[ 0 ].y == index ]
+        self._lines[ "row" if direction == "row" else "column" ][ index ].constraint = constraint
+        # The model and the colours have to be computed again with the new constraint
+        self._model = None
+        self._colours = None
 
-        selected[ 0 ].constraint = constraint
+    def set_cell( self, row: int, col: int, value: Union[ bool, int ] ) -> None:
+        """ Setting the value of a cell as known, the solutions found afterwards will all agree with it
 
-    def solve( self ) -> None:
-        """ Solving the current game instance as a constraint programming problem
+        :param row: Row of the cell
+        :type row: int
+        :param col: Column of the cell
+        :type col: int
+        :param value: True if the cell is full, False if it is empty, or the colour of the cell, 0 if empty
+        :type value: Union[ bool, int ]
+        :return: None
+        :rtype: None
 
+        :raises IndexError: error raised when the cell is out of the board range
+        :raises ValueError: error raised when the colour is not one of the board
+        """
+
+        if row not in range( 0, self.size ) or col not in range( 0, self.size ):
+            raise IndexError( "Cell out of the game board: {}, boundaries [ 0, {} ]".format( Coordinates( row, col ),
+                                                                                         self.size ) )
+        if int( value ) not in range( 0, self.colours + 1 ):
+            raise ValueError( "Colour {} not in the board, boundaries [ 0, {} ]".format( int( value ), self.colours ) )
+
+        self.board[ row ][ col ] = Cell( known=True, colour=int( value ) )
+
+    def clear_cell( self, row: int, col: int ) -> None:
+        """ Forgetting the value of a cell
+
+        :param row: Row of the cell
+        :type row: int
+        :param col: Column of the cell
+        :type col: int
         :return: None
         :rtype: None
         """
 
+        self.board[ row ][ col ] = Cell()
+
+    def known_cells( self ) -> List[ Tuple[ int, int, int ] ]:
+        """ Listing the cells whose value is known
+
+        :return: Row, column and colour of each known cell, the colour being 0 if the cell is empty
+        :rtype: List[ Tuple[ int, int, int ] ]
+        """
+
+        return [ ( row, col, cell.colour )
+                 for row, line in enumerate( self.board )
+                 for col, cell in enumerate( line ) if cell.known ]
+
+    def to_dict( self ) -> Dict:
+        """ Describing the board constraints as a dictionary of plain types, e.g. to be sent as JSON
+
+        Coloured blocks are described as [ length, colour ] pairs. The known cells, if any, are described by "cells",
+        one string per row where each cell is either CELL_UNKNOWN or the symbol given by :func:`cell_symbol`.
+
+        :return: Dictionary with keys "size", "rows", "columns" and, if some cells are known, "cells"
+        :rtype: Dict
+        """
+
+        rows = [ [ el if isinstance( el, int ) else list( el ) for el in region.constraint ] for region in self.rows ]
+        columns = [ [ el if isinstance( el, int ) else list( el ) for el in region.constraint ]
+                    for region in self.columns ]
+
+        result = { "size": self.size, "rows": rows, "columns": columns }
+        if self.known_cells():
+            coloured = self.colours > 1
+            result[ "cells" ] = [ "".join( [ cell_symbol( cell.colour, coloured ) if cell.known else CELL_UNKNOWN
+                                             for cell in line ] )
+                                  for line in self.board ]
+
+        return result
+
+    def _build_model( self ) -> cp_model.CpModel:
+        """ Building the CP model of the constraints, or reusing the one built by a previous call
+
+        The known cells are not part of the model, they are passed to the solver as assumptions instead, so that the
+        same model can answer queries on different partial boards.
+
+        :return: The CP model
+        :rtype: cp_model.CpModel
+        """
+
+        if self._model is not None:
+            return self._model
+
+        self._cp_literal = {}
+        if self.colours > 1:
+            return self._build_colour_model()
+
         # Creating the CP problem
         model = cp_model.CpModel()
 
@@ -211,41 +418,61 @@ class NonogramBoard:
                 region_index = region.region[ 0 ].y
                 region_variables = [ var[ region_index ] for var in cp_cell ]
 
+            # Black and white boards might still use ( length, 1 ) pairs
+            constraint = [ length for length, _ in region.blocks ]
+
             # Sum of the region must sum up to the region constraint
-            model.Add( cp_model.LinearExpr.Sum( region_variables ) == sum( region.constraint ) )
+            model.Add( cp_model.LinearExpr.Sum( region_variables ) == sum( constraint ) )
 
             # Region variables and constraints
             # Space between sequences
-            space_max = self.size - sum( region.constraint )
+            space_max = self.size - sum( constraint )
             # Leading space of the region
             space_variables = [ model.NewIntVar( 0, space_max, "{}{}-space_0".format( region_index, region_type ) ) ]
 
             # Handling each sequence of the constraint
             seq_variables = []
+            # Precomputed placements information, shared among all the regions with the same constraint
+            info = line_info( self.size, region.constraint )
             seq_element = 0
+            seq_block = 0
             seq_cum = 0
-            for seq_index, seq_length in enumerate( region.constraint, start=1 ):
+            for seq_index, seq_length in enumerate( constraint, start=1 ):
                 for i in range( seq_length ):
                     # Creating one variable for each element of the given constraint
+                    # Its position is bounded by the leftmost and rightmost placements of its sequence
+                    el_min, el_max = 0, self.size
+                    if info.count:
+                        el_min = info.leftmost[ seq_block ] + i
+                        el_max = info.rightmost[ seq_block ] + i
                     seq_variables.append(
-                            model.NewIntVar( 0,
-                                             self.size,
+                            model.NewIntVar( el_min,
+                                             el_max,
                                              "{}{}-el_{}".format( region_index, region_type, seq_element ) ) )
                     # Each element of the sequence depends on the spaces and sequences before it
                     model.Add( seq_variables[ -1 ] == cp_model.LinearExpr.Sum( space_variables ) + seq_cum + i )
                     seq_element += 1
                 seq_cum += seq_length
+                seq_block += 1 if seq_length > 0 else 0
 
                 # Creating a variable for the space following the current sequence
                 # If the current sequence is the last of the board then the space might not exist
                 # Setting at least one space between sequences inside the region
-                min_space_domain = 0 if seq_index == len( region.constraint ) else 1
+                min_space_domain = 0 if seq_index == len( constraint ) else 1
                 space_variables.append( model.NewIntVar( min_space_domain,
                                                          max( 1, space_max ),
                                                          "{}{}-space_{}".format( region_index,
                                                                                  region_type,
                                                                                  seq_index ) ) )
 
+            # Fixing the cells having the same value in every placement of the region
+            if info.count:
+                for cell_var, value in zip( region_variables, info.forced ):
+                    if value == EMPTY:
+                        model.Add( cell_var == 0 )
+                    elif value != UNKNOWN:
+                        model.Add( cell_var == 1 )
+
             # Associating the element variables to the cells of the board
             for el_var in seq_variables:
                 model.AddElement( el_var, region_variables, 1 )
@@ -257,78 +484,176 @@ class NonogramBoard:
             cp_region.extend( space_variables )
             cp_region.extend( seq_variables )
 
+        self._model = model
+        self._cp_cell = cp_cell
+        self._cp_region = cp_region
+
+        return model
+
+    def _build_colour_model( self ) -> cp_model.CpModel:
+        """ Building the CP model of a multi-colour board
+
+        Each cell is a single integer variable holding its colour, 0 if empty, and each region is constrained by the
+        automaton of its constraint, taken from the line table.
+
+        :return: The CP model
+        :rtype: cp_model.CpModel
+        """
+
+        model = cp_model.CpModel()
+
+        # Creating a variable for each cell of the table
+        cp_cell = [ [ model.NewIntVar( 0, self.colours, "{}-{}".format( row, col ) ) for col in range( self.size ) ]
+                    for row in range( self.size ) ]
+
+        for region in self.regions:
+            if region.is_row():
+                region_variables = cp_cell[ region.region[ 0 ].x ]
+            else:
+                region_variables = [ var[ region.region[ 0 ].y ] for var in cp_cell ]
+
+            info = line_info( self.size, region.constraint )
+            start, finals, transitions = info.automaton
+            model.AddAutomaton( region_variables, start, finals, transitions )
+
+            # Fixing the cells having the same value in every placement of the region
+            for cell_var, value in zip( region_variables, info.forced ):
+                if value != UNKNOWN:
+                    model.Add( cell_var == value )
+
+        self._model = model
+        self._cp_cell = cp_cell
+        self._cp_region = []
+
+        return model
+
+    def _literal( self, row: int, col: int, colour: int ) -> cp_model.IntVar:
+        """ Literal true when the cell has the given colour, created on first use for multi-colour boards
+
+        :param row: Row of the cell
+        :type row: int
+        :param col: Column of the cell
+        :type col: int
+        :param colour: Colour of the cell, 0 if empty
+        :type colour: int
+        :return: The literal
+        :rtype: cp_model.IntVar
+        """
+
+        var = self._cp_cell[ row ][ col ]
+        if self.colours == 1:
+            return var if colour else var.Not()
+
+        key = ( row, col, colour )
+        if key not in self._cp_literal:
+            literal = self._model.NewBoolVar( "{}-{}-is_{}".format( row, col, colour ) )
+            self._model.Add( var == colour ).OnlyEnforceIf( literal )
+            self._model.Add( var != colour ).OnlyEnforceIf( literal.Not() )
+            self._cp_literal[ key ] = literal
+
+        return self._cp_literal[ key ]
+
+    def _assume_known_cells( self ) -> cp_model.CpModel:
+        """ Building the CP model and replacing its assumptions with the current known cells
+
+        :return: The CP model
+        :rtype: cp_model.CpModel
+        """
+
+        model = self._build_model()
+        model.ClearAssumptions()
+        model.AddAssumptions( [ self._literal( row, col, colour ) for row, col, colour in self.known_cells() ] )
+
+        return model
+
+    def solve( self, time_limit: float = None, solver: cp_model.CpSolver = None, max_solutions: int = None ) -> None:
+        """ Solving the current game instance as a constraint programming problem
+
+        :param time_limit: Maximum number of seconds given to the solver, no limit if None
+        :type time_limit: float
+        :param solver: Solver to use, e.g. to stop the search from another thread, a new one is created if None
+        :type solver: cp_model.CpSolver
+        :param max_solutions: Number of solutions after which the search is stopped, no limit if None
+        :type max_solutions: int
+        :return: None
+        :rtype: None
+        """
+
+        model = self._assume_known_cells()
+
         # Solving the problem
-        solver = cp_model.CpSolver()
-        solutions = CpSolutionPrinter( { "cells": [ var for row in cp_cell for var in row ],
-                                         "regions": cp_region } )
+        if solver is None:
+            solver = cp_model.CpSolver()
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        solutions = CpSolutionPrinter( { "cells": [ var for row in self._cp_cell for var in row ],
+                                         "regions": self._cp_region },
+                                       max_solutions )
         status = solver.SearchForAllSolutions( model, solutions )
         #   print( "The problem is {}. {} solutions have been found.".format( solver.StatusName( status ),
         #                                                                     len( solutions ) ) )
 
         # Saving the solutions found
         self.solutions = solutions.solutions
+        self.grids = [ self.grid_of( solution ) for solution in self.solutions ]
+        self.status = solver.StatusName( status )
+        self.engine = ENGINE_CP_SAT
+        self.capped = solutions.capped
+
+    def has_solution( self, time_limit: float = None ) -> bool:
+        """ Checking if the board, with its known cells, still has at least one solution
+
+        Unlike :meth:`solve` the search stops at the first solution found, and the stored solutions are not modified.
+
+        :param time_limit: Maximum number of seconds given to the solver, no limit if None
+        :type time_limit: float
+        :return: True if a solution exists, False if none exists or none has been found within the time limit
+        :rtype: bool
+        """
+
+        model = self._assume_known_cells()
+
+        solver = cp_model.CpSolver()
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+
+        return solver.Solve( model ) in [ cp_model.OPTIMAL, cp_model.FEASIBLE ]
+
+    def grid_of( self, solution: List[ Tuple[ cp_model.IntVar, int ] ] ) -> List[ List[ Cell ] ]:
+        """ Recomposing the nonogram board from the values of a solution found by the solver
+
+        The cell variables come first in a solution, one row after the other, so that no variable name is parsed;
+        cells cannot be modified, hence a single cell is shared by all the cells of the same colour.
+
+        :param solution: Solution as stored by :class:`CpSolutionPrinter`
+        :type solution: List[ Tuple[ cp_model.IntVar, int ] ]
+        :return: The board of cells of the given solution
+        :rtype: List[ List[ Cell ] ]
+        """
+
+        size = self.size
+        values = [ value for _, value in solution[ :size * size ] ]
+        palette = [ Cell( colour=colour ) for colour in range( max( values + [ 0 ] ) + 1 ) ]
+
+        return [ [ palette[ value ] for value in values[ row * size:( row + 1 ) * size ] ] for row in range( size ) ]
 
     def print( self, data: List[ List[ Cell ] ] = None ) -> str:
         """ Printing the nonogram table on a formatted string
 
-        :param data: Data of the board to use if a solution has been provided
+        :param data: Data of the board to use if a solution has been provided, the board itself if None, its unknown
+            cells being printed as CELL_UNKNOWN
         :type data: List[ List[ Cell ] ]
         :return: The formatted string
         :rtype: str
         """
 
-        result = ""
-
-        # If not data is provided, printing the empty board
-        if data is None:
-            data = self.board
-            result = " *** Nonogram {}x{} board ***\n\n".format( self.size, self.size )
-
-        # Fancy spaces for the constraints
-        left_space = max( [ len( region.constraint ) for region in self.regions ] ) * 2
-        table_space = len( str( max( [ max( region.constraint ) for region in self.regions if region.is_column() ] ) ) )
-
-        # Column constraints
-        max_constraint = max( [ len( region.constraint ) for region in self.regions if region.is_column() ] )
-        for index in range( max_constraint ):
-            result += "{msg:{space}} | ".format( msg="", space=left_space )
-            for region in [ region for region in self.regions if region.is_column() ]:
-                # Showing the column constraint starting closer to the board
-                if len( region.constraint ) < max_constraint:
-                    if max_constraint - index <= len( region.constraint ):
-                        #   msg = region.constraint[ max_constraint - index - 1 ]
-                        msg = region.constraint[ abs( max_constraint - len( region.constraint ) - index ) ]
-                    else:
-                        msg = " "
-                else:
-                    msg = region.constraint[ index ]
-                result += "{msg:{table_space}} ".format( msg=msg, table_space=table_space )
-            result += "\n"
-
-        # Divider
-        result += "{}\n".format( "-" * ( left_space + self.size * ( table_space + 1 ) + 3 ) )
-
-        # Row constraints and table cells
-        row_index = 0
-        for region in self.regions:
-            if region.is_row():
-                result += "{constraint:>{space}} | {row}".format(
-                            constraint=" ".join( [ str( el ) for el in region.constraint ] ),
-                            space=left_space,
-                            row=" ".join( [ "{msg:>{space}}".format( msg=CELL_FULL if el.value else CELL_EMPTY,
-                                                                     space=table_space )
-                                            for el in data[ row_index ] ] ),
-                            table_space=table_space )
-                row_index += 1
-                result += "\n"
-
-                #   if row_index % 5 == 0:
-                #       result += "{msg:{left_space}} | {table}\n".format(
-                #               msg="",
-                #               left_space=left_space,
-                #               table="-" * ( ( self.size + int( self.size / 5 ) ) * 2 * table_space ) )
+        # Imported here since the rendering layer is built on top of this module
+        from nonogram_render import write_text
 
-        return result
+        result = io.StringIO()
+        write_text( self, result, data )
+
+        return result.getvalue()
 
     def print_solutions( self ) -> str:
         """ Printing all the solutions found
@@ -342,20 +667,13 @@ class NonogramBoard:
         if self.solutions is None:
             raise ValueError( "No solutions have been found yet!" )
 
+        from nonogram_render import write_solutions_text
+
         # Composing the formatted string with all the solutions found
-        result = ""
-        for index, solution in enumerate( self.solutions, start=1 ):
-            result += " === Solution {} ===\n\n".format( index )
-            # Recomposing the nonogram board from the solutions found
-            solution_data = []
-            for i in range( self.size ):
-                solution_data.append( [ Cell( bool( cell_value[ 1 ] ) ) for cell_value in solution
-                                        if match( r"\d+-\d+", cell_value[ 0 ].Name() ) and
-                                        int( cell_value[ 0 ].Name().split( "-" )[ 0 ] ) == i ] )
-
-            result += self.print( solution_data )
+        result = io.StringIO()
+        write_solutions_text( self, result )
 
-        return result
+        return result.getvalue()
 
 
 class CpSolutionPrinter( cp_model.CpSolverSolutionCallback ):
@@ -365,13 +683,17 @@ class CpSolutionPrinter( cp_model.CpSolverSolutionCallback ):
     :ivar _cell_variables: (List[ cp_model.IntVar ]) CP variables of the cell composing the Nonogram board
     :ivar _region_variables: (List[ cp_model.IntVar ]) CP variables of the regions of the Nonogram board
     :ivar _solutions: (List[ List[ Tuple[ cp_model.IntVar, int ] ] ]) List of solutions found stored as tuples
+    :ivar _max_solutions: (int) Number of solutions after which the search is stopped, no limit if None
+    :ivar _capped: (bool) True if the search has been stopped because it reached the maximum number of solutions
     """
 
-    def __init__( self, variables: Dict[ str, List[ cp_model.IntVar ] ] ):
+    def __init__( self, variables: Dict[ str, List[ cp_model.IntVar ] ], max_solutions: int = None ):
         cp_model.CpSolverSolutionCallback.__init__( self )
         self._cell_variables = variables[ "cells" ]
         self._region_variables = variables[ "regions" ]
         self._solutions = []
+        self._max_solutions = max_solutions
+        self._capped = False
 
     @property
     def variables( self ) -> List[ cp_model.IntVar ]:
@@ -389,6 +711,10 @@ class CpSolutionPrinter( cp_model.CpSolverSolutionCallback ):
     def solutions( self ) -> List:
         return self._solutions
 
+    @property
+    def capped( self ) -> bool:
+        return self._capped
+
     def __len__( self ):
         return len( self.solutions )
 
@@ -400,6 +726,9 @@ class CpSolutionPrinter( cp_model.CpSolverSolutionCallback ):
         """
 
         self.solutions.append( [ ( var, self.Value( var ) ) for var in self.variables ] )
+        if self._max_solutions is not None and len( self.solutions ) >= self._max_solutions:
+            self._capped = True
+            self.StopSearch()
 
         # More detailed information of all the variables of the cp problem
         #   for index in range( int( math.sqrt( len( self.cell_variables ) ) ) ):
@@ -413,6 +742,57 @@ class CpSolutionPrinter( cp_model.CpSolverSolutionCallback ):
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ FUNCTIONS ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def clue_text( block: Union[ int, Tuple[ int, int ] ] ) -> str:
+    """ Formatting a block of a constraint, coloured blocks being followed by the symbol of their colour
+
+    :param block: Either the length of a black block or a ( length, colour ) pair
+    :type block: Union[ int, Tuple[ int, int ] ]
+    :return: The formatted block
+    :rtype: str
+    """
+
+    if isinstance( block, int ):
+        return str( block )
+
+    return "{}{}".format( block[ 0 ], COLOUR_SYMBOLS[ block[ 1 ] - 1 ] )
+
+
+def cell_symbol( colour: int, coloured: bool = False ) -> str:
+    """ Symbol of a cell of the given colour
+
+    :param colour: Colour of the cell, 0 if empty
+    :type colour: int
+    :param coloured: True if the cell belongs to a multi-colour board, where colours are shown as letters
+    :type coloured: bool
+    :return: The symbol of the cell
+    :rtype: str
+    """
+
+    if not colour:
+        return CELL_EMPTY
+
+    return COLOUR_SYMBOLS[ colour - 1 ] if coloured else CELL_FULL
+
+
+def symbol_colour( symbol: str ) -> int:
+    """ Colour of a cell symbol, i.e. the inverse of :func:`cell_symbol`
+
+    :param symbol: Symbol of the cell
+    :type symbol: str
+    :return: The colour of the cell, 0 if empty
+    :rtype: int
+
+    :raises ValueError: error raised when the symbol is not a cell symbol
+    """
+
+    if symbol == CELL_EMPTY:
+        return 0
+    if symbol == CELL_FULL:
+        return 1
+    if symbol not in COLOUR_SYMBOLS:
+        raise ValueError( "Unknown cell symbol: {}".format( symbol ) )
+
+    return COLOUR_SYMBOLS.index( symbol ) + 1
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ MAIN ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
@@ -424,6 +804,8 @@ def main():
     arg_parser = argparse.ArgumentParser( description="<description>" )
     arg_parser.add_argument( "--save", dest="save", default=False, action="store_true",
                              help="Flag to indicate if the results have to be saved on file or not" )
+    arg_parser.add_argument( "--estimate", dest="estimate", default=False, action="store_true",
+                             help="Flag to print the estimated cost of each board and the time taken to solve it" )
 
     input_args = vars( arg_parser.parse_args() )
     # endregion
@@ -562,8 +944,15 @@ def main():
         print( "_" * 50, end="\n\n" )
         # Printing the board with the constraints
         print( nonogram.print() )
+        if input_args[ "estimate" ]:
+            # Imported here since the estimator is built on top of this module
+            from nonogram_estimate import estimate
+            print( estimate( nonogram ), end="\n\n" )
         # Solve
+        start = time.perf_counter()
         nonogram.solve()
+        if input_args[ "estimate" ]:
+            print( "Solved in {:.3f}s, status {}".format( time.perf_counter() - start, nonogram.status ), end="\n\n" )
         # Printing the solutions found
         print( nonogram.print_solutions() )
 